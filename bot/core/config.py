@@ -1,62 +1,125 @@
+from functools import cached_property, lru_cache
+
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+# Значения по умолчанию для разработки; в production должны быть переопределены
+DEFAULT_SECRET_KEY = (
+    "dev-secret-key-change-in-production-min-32-chars-"
+    "12345678901234567890123456789012"
+)
+DEFAULT_JWT_SECRET_KEY = (
+    "dev-jwt-secret-key-change-in-production-min-32-chars-"
+    "12345678901234567890123456789012"
+)
+
 
 class Settings(BaseSettings):
     """Настройки приложения"""
 
+    # Значения по умолчанию; переменные окружения (OPENAI_API_KEY, PORT, ...)
+    # подставляет сам BaseSettings при создании экземпляра
+
     # OpenAI API
-    openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    openai_api_key: str = ""
+    openai_max_concurrency: int = 128  # одновременных запросов к OpenAI на процесс
+    openai_max_retries: int = 3  # повторы при 429/5xx (с backoff внутри SDK)
+    openai_model: str = "gpt-4o"  # анализ фото и рецепты (нужна поддержка изображений)
+    openai_meal_plan_model: str = "gpt-4o-mini"  # рацион: GPT только подбирает продукты
+    openai_meal_plan_max_tokens: int = 1200
 
     # Database
-    database_url: str = os.getenv("DATABASE_URL", "sqlite://db.sqlite3?charset=utf8")
+    database_url: str = "sqlite://db.sqlite3?charset=utf8"
+    # Создавать таблицы при старте; отключите (GENERATE_SCHEMAS=false),
+    # если схема применяется миграциями Aerich
+    generate_schemas: bool = True
 
     # Web App Settings
-    secret_key: str = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production-min-32-chars-12345678901234567890123456789012")
-    debug: bool = os.getenv("DEBUG", "true").lower() == "true"
-    host: str = os.getenv("HOST", "0.0.0.0")
-    port: int = int(os.getenv("PORT", "8000"))
+    secret_key: str = DEFAULT_SECRET_KEY
+    debug: bool = True
+    host: str = "0.0.0.0"
+    port: int = 8000
 
     # JWT Settings
-    jwt_secret_key: str = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret-key-change-in-production-min-32-chars-12345678901234567890123456789012")
+    jwt_secret_key: str = DEFAULT_JWT_SECRET_KEY
     jwt_algorithm: str = "HS256"
     jwt_expiration_hours: int = 24
 
     # CORS Settings - пустая строка означает localhost только
-    cors_origins: str = os.getenv("CORS_ORIGINS", "")
+    cors_origins: str = ""
 
     # File Upload Settings
     max_upload_size: int = 10 * 1024 * 1024  # 10MB
     allowed_image_types: str = "image/jpeg,image/png,image/webp"
 
     # Redis (для продакшена)
-    redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379")
+    redis_url: str = "redis://localhost:6379"
 
     model_config = SettingsConfigDict(
         env_file=None,  # Отключаем загрузку .env файла
-        case_sensitive=False
+        case_sensitive=False,
+        frozen=True
     )
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
+    @cached_property
+    def cors_origin_list(self) -> tuple[str, ...]:
+        """Разобранный список CORS_ORIGINS"""
+        return tuple(
+            origin.strip() for origin in self.cors_origins.split(",") if origin.strip()
+        )
+
+    @cached_property
+    def allowed_image_types_set(self) -> frozenset[str]:
+        """Разрешенные MIME типы изображений"""
+        return frozenset(
+            mime.strip() for mime in self.allowed_image_types.split(",") if mime.strip()
+        )
+
+    @model_validator(mode="after")
+    def check_production_settings(self) -> "Settings":
         # В production режиме проверяем критические настройки
-        if not self.debug:
+        # (проверки только пишут в лог - пропускаем, если WARNING отключен)
+        if not self.debug and logger.isEnabledFor(logging.WARNING):
+            # Один снимок окружения вместо повторных os.getenv
+            env = os.environ
+            has_secret_key = bool(env.get("SECRET_KEY"))
+            has_jwt_secret_key = bool(env.get("JWT_SECRET_KEY"))
+
             # Проверяем только если переменные установлены явно (не значения по умолчанию)
-            if os.getenv("SECRET_KEY") and self.secret_key == "dev-secret-key-change-in-production-min-32-chars-12345678901234567890123456789012":
-                print("⚠️  WARNING: SECRET_KEY все еще имеет значение по умолчанию!")
-            if os.getenv("JWT_SECRET_KEY") and self.jwt_secret_key == "dev-jwt-secret-key-change-in-production-min-32-chars-12345678901234567890123456789012":
-                print("⚠️  WARNING: JWT_SECRET_KEY все еще имеет значение по умолчанию!")
-            if os.getenv("CORS_ORIGINS") and not self.cors_origins.strip():
-                print("⚠️  WARNING: CORS_ORIGINS не настроен!")
+            if has_secret_key and self.secret_key == DEFAULT_SECRET_KEY:
+                logger.warning("SECRET_KEY все еще имеет значение по умолчанию!")
+            if has_jwt_secret_key and self.jwt_secret_key == DEFAULT_JWT_SECRET_KEY:
+                logger.warning("JWT_SECRET_KEY все еще имеет значение по умолчанию!")
+            if env.get("CORS_ORIGINS") and not self.cors_origins.strip():
+                logger.warning("CORS_ORIGINS не настроен!")
 
             # Критическая проверка - если SECRET_KEY не установлен вообще
-            if not os.getenv("SECRET_KEY"):
-                print("⚠️  WARNING: SECRET_KEY не установлен! Используется значение по умолчанию.")
-            if not os.getenv("JWT_SECRET_KEY"):
-                print("⚠️  WARNING: JWT_SECRET_KEY не установлен! Используется значение по умолчанию.")
+            if not has_secret_key:
+                logger.warning(
+                    "SECRET_KEY не установлен! Используется значение по умолчанию."
+                )
+            if not has_jwt_secret_key:
+                logger.warning(
+                    "JWT_SECRET_KEY не установлен! Используется значение по умолчанию."
+                )
+
+            logger.info("Production mode activated")
+
+        return self
+
 
-            print("✅ Production mode activated")
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Экземпляр настроек, создается при первом обращении"""
+    return Settings()
 
 
-# Глобальный экземпляр настроек
-settings = Settings()
\ No newline at end of file
+def __getattr__(name: str):
+    # Обратная совместимость: `from bot.core.config import settings`
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,137 @@
-from tortoise import fields, Tortoise
+import logging
+import math
+from functools import lru_cache
+
+from tortoise import fields
+from tortoise.exceptions import NoValuesFetched
 from tortoise.models import Model
+import os
+import time
 import uuid
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode
+
+logger = logging.getLogger(__name__)
+
+
+def _uuid7() -> uuid.UUID:
+    """
+    UUID версии 7 (RFC 9562): 48 бит времени в мс + случайный хвост.
+
+    Ключи растут вместе со временем создания, поэтому новые записи
+    попадают в конец индекса, а не в случайные страницы.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # версия 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # вариант RFC 4122
+    return uuid.UUID(int=value)
+
+
+# Шаблоны форматирования КБЖУ
+_KBZHU_PER_100G_TEMPLATE = (
+    "КБЖУ на 100 г:\n"
+    "{calories} ккал {protein}г/{fat}г/{carbs}г"
+)
+_KBZHU_TOTAL_TEMPLATE = (
+    "Калории: {calories:.0f} ккал\n"
+    "Белки: {protein:.1f} г\n"
+    "Жиры: {fat:.1f} г\n"
+    "Углеводы: {carbs:.1f} г"
+)
+
+
+def _to_tenths(value: float) -> int:
+    """
+    Граммы -> целые десятые доли грамма
+
+    Половина округляется вверх (не к четному, как round) - так же, как
+    в миграции 4, переводящей существующие строки.
+    """
+    return math.floor(value * 10 + 0.5)
+
+
+def _format_tenths(value: int) -> str:
+    """Десятые доли -> строка с одним знаком после запятой, без float"""
+    whole, tenth = divmod(value, 10)
+    return f"{whole}.{tenth}"
+
+
+def _tenths_property(field_name: str) -> property:
+    """Свойство в граммах поверх целочисленного поля с десятыми долями"""
+
+    def getter(self) -> float:
+        return getattr(self, field_name) / 10
+
+    def setter(self, value: float) -> None:
+        setattr(self, field_name, _to_tenths(value))
+
+    return property(getter, setter)
+
+
+# Поля RecipeBase, хранящиеся в десятых долях (имя без суффикса _x10)
+_PER_100G_FIELDS = (
+    "calories_per_100g",
+    "protein_per_100g",
+    "fat_per_100g",
+    "carbs_per_100g",
+)
+
+
+class KbzhuMixin:
+    """
+    Общее форматирование КБЖУ для моделей рецептов
+
+    Колонки у моделей разные (десятые доли на 100 г / итог в float),
+    поэтому модель задаёт только шаблон и значения для него:
+    _kbzhu_template и метод _kbzhu_values() -> Dict[str, Any].
+    """
+
+    _kbzhu_template: str
+    _kbzhu_values: Callable[[], Dict[str, Any]]
+
+    @property
+    def kbzhu_formatted(self) -> str:
+        """Форматированное КБЖУ"""
+        return self._kbzhu_template.format(**self._kbzhu_values())
+
+
+def _split_tags(tags: Optional[str]) -> List[str]:
+    """Разобрать строку тегов через запятую в список уникальных имён"""
+    if not tags:
+        return []
+    return list(dict.fromkeys(t.strip().lower() for t in tags.split(",") if t.strip()))
+
+
+class Tag(Model):
+    """Тег рецепта из общей базы"""
+
+    id = fields.BigIntField(pk=True)
+    name = fields.CharField(max_length=64, unique=True, description="Название тега")
+
+    class Meta:
+        table = "tags"
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
 
 
-class RecipeBase(Model):
+class RecipeBase(KbzhuMixin, Model):
     """Базовая библиотека рецептов (общая база)"""
 
-    id = fields.UUIDField(pk=True, default=uuid.uuid4)
+    # Внутренняя библиотека: монотонный BIGINT вдвое уже UUID в PK и связях тегов
+    id = fields.BigIntField(pk=True)
 
     # Основная информация
     title = fields.CharField(max_length=500, description="Название рецепта")
-    tags = fields.TextField(null=True, description="Теги через запятую")
+    tags: fields.ManyToManyRelation[Tag] = fields.ManyToManyField(
+        "models.Tag",
+        related_name="recipes",
+        through="recipe_base_tag",
+        forward_key="tag_id",
+        backward_key="recipe_base_id",
+        description="Теги",
+    )
 
     # Метаданные
     cooking_time = fields.CharField(
@@ -18,11 +139,13 @@ class RecipeBase(Model):
     )
     difficulty = fields.CharField(max_length=50, null=True, description="Сложность")
 
-    # КБЖУ на 100 г
-    calories_per_100g = fields.FloatField(description="Калории на 100г")
-    protein_per_100g = fields.FloatField(description="Белки на 100г")
-    fat_per_100g = fields.FloatField(description="Жиры на 100г")
-    carbs_per_100g = fields.FloatField(description="Углеводы на 100г")
+    # КБЖУ на 100 г в десятых долях (1 знак после запятой, 2 байта на значение)
+    calories_per_100g_x10 = fields.SmallIntField(
+        index=True, description="Калории на 100г x10"
+    )
+    protein_per_100g_x10 = fields.SmallIntField(description="Белки на 100г x10")
+    fat_per_100g_x10 = fields.SmallIntField(description="Жиры на 100г x10")
+    carbs_per_100g_x10 = fields.SmallIntField(description="Углеводы на 100г x10")
 
     # Содержимое
     ingredients = fields.TextField(description="Список ингредиентов")
@@ -31,48 +154,67 @@ class RecipeBase(Model):
     # Дополнительные заметки
     notes = fields.TextField(null=True, description="Дополнительные заметки")
 
-    created_at = fields.DatetimeField(auto_now_add=True, description="Дата добавления")
+    created_at = fields.DatetimeField(
+        auto_now_add=True, index=True, description="Дата добавления"
+    )
 
     class Meta:
         table = "recipe_base"
         ordering = ["-created_at"]
 
+    def __init__(self, **kwargs) -> None:
+        # Принимаем КБЖУ в граммах, как и раньше: calories_per_100g=250.5
+        for name in _PER_100G_FIELDS:
+            if name in kwargs:
+                kwargs[f"{name}_x10"] = _to_tenths(kwargs.pop(name))
+        super().__init__(**kwargs)
+
     def __str__(self):
         return f"RecipeBase: {self.title}"
 
-    @staticmethod
-    def _format_kbzhu(calories: float, protein: float, fat: float, carbs: float, per_100g: bool = False) -> str:
-        """Форматировать КБЖУ в читаемый вид"""
-        if per_100g:
-            return (
-                f"КБЖУ на 100 г:\n"
-                f"{calories:.0f} ккал "
-                f"{protein:.1f}г/{fat:.1f}г/{carbs:.1f}г"
-            )
-        else:
-            return (
-                f"Калории: {calories:.0f} ккал\n"
-                f"Белки: {protein:.1f} г\n"
-                f"Жиры: {fat:.1f} г\n"
-                f"Углеводы: {carbs:.1f} г"
-            )
+    calories_per_100g = _tenths_property("calories_per_100g_x10")
+    protein_per_100g = _tenths_property("protein_per_100g_x10")
+    fat_per_100g = _tenths_property("fat_per_100g_x10")
+    carbs_per_100g = _tenths_property("carbs_per_100g_x10")
 
     @property
-    def kbzhu_formatted(self) -> str:
-        """Форматированное КБЖУ на 100г"""
-        return self._format_kbzhu(
-            self.calories_per_100g,
-            self.protein_per_100g,
-            self.fat_per_100g,
-            self.carbs_per_100g,
-            per_100g=True
-        )
+    def tags_text(self) -> Optional[str]:
+        """Теги через запятую (требует prefetch_related("tags"))"""
+        try:
+            names = [tag.name for tag in self.tags]
+        except NoValuesFetched:
+            return None
+        return ", ".join(names) or None
+
+    async def set_tags(self, tags: Optional[str]) -> None:
+        """Заменить теги рецепта тегами из строки через запятую"""
+        names = _split_tags(tags)
+        await self.tags.clear()
+        if not names:
+            return
+        existing = {tag.name: tag for tag in await Tag.filter(name__in=names)}
+        for name in names:
+            if name not in existing:
+                existing[name] = await Tag.create(name=name)
+        await self.tags.add(*existing.values())
+
+    _kbzhu_template = _KBZHU_PER_100G_TEMPLATE
 
+    def _kbzhu_values(self) -> Dict[str, Any]:
+        return {
+            # round() с округлением половины к четному, как прежний формат :.0f
+            "calories": round(self.calories_per_100g_x10 / 10),
+            "protein": _format_tenths(self.protein_per_100g_x10),
+            "fat": _format_tenths(self.fat_per_100g_x10),
+            "carbs": _format_tenths(self.carbs_per_100g_x10),
+        }
 
-class Recipe(Model):
+
+class Recipe(KbzhuMixin, Model):
     """Модель рецепта"""
 
-    id = fields.UUIDField(pk=True, default=uuid.uuid4)
+    # UUID: id рецепта открыт в URL и не должен перебираться
+    id = fields.UUIDField(pk=True, default=_uuid7)
 
     # Исходные данные
     photo_file_id = fields.CharField(max_length=500, description="Путь к файлу фото")
@@ -93,34 +235,102 @@ class Recipe(Model):
     calculated_fat = fields.FloatField(description="Рассчитанные жиры (г)")
     calculated_carbs = fields.FloatField(description="Рассчитанные углеводы (г)")
 
-    created_at = fields.DatetimeField(auto_now_add=True, description="Дата создания")
+    created_at = fields.DatetimeField(
+        auto_now_add=True, index=True, description="Дата создания"
+    )
 
     class Meta:
         table = "recipes"
         ordering = ["-created_at"]
 
+    # Колонки карточки рецепта в списках (без TEXT полей)
+    SUMMARY_FIELDS = (
+        "id",
+        "calculated_calories",
+        "calculated_protein",
+        "calculated_fat",
+        "calculated_carbs",
+        "created_at",
+    )
+
     def __str__(self):
         return f"Recipe {self.id}"
 
-    @property
-    def kbzhu_formatted(self) -> str:
-        """Форматированное КБЖУ"""
-        return RecipeBase._format_kbzhu(
-            self.calculated_calories,
-            self.calculated_protein,
-            self.calculated_fat,
-            self.calculated_carbs,
-            per_100g=False
+    @classmethod
+    def summaries(cls, *extra_fields: str, limit: int = 20, offset: int = 0):
+        """
+        Запрос кратких данных последних рецептов (словари через values())
+
+        Полная запись - только через Recipe.get().
+
+        Args:
+            extra_fields: Дополнительные колонки сверх SUMMARY_FIELDS
+            limit: Максимальное количество рецептов
+            offset: Смещение от самого нового рецепта
+        """
+        return (
+            cls.all()
+            .order_by("-created_at")
+            .offset(offset)
+            .limit(limit)
+            .values(*cls.SUMMARY_FIELDS, *extra_fields)
         )
 
+    _kbzhu_template = _KBZHU_TOTAL_TEMPLATE
+
+    def _kbzhu_values(self) -> Dict[str, Any]:
+        return {
+            "calories": self.calculated_calories,
+            "protein": self.calculated_protein,
+            "fat": self.calculated_fat,
+            "carbs": self.calculated_carbs,
+        }
+
 
 # --- Конфигурация Tortoise ORM для Aerich ---
+# PRAGMA, которые Tortoise выполняет при открытии SQLite соединения
+# (journal_mode=WAL он включает сам)
+SQLITE_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": "-20000",  # ~20 МБ страничного кэша
+    "mmap_size": "268435456",  # 256 МБ
+}
+
+
+def _with_sqlite_pragmas(db_url: str) -> str:
+    """Добавить SQLITE_PRAGMAS в параметры SQLite URL (явно заданные не трогаем)"""
+    if not db_url.startswith("sqlite://"):
+        return db_url
+    _, _, query = db_url.partition("?")
+    existing = parse_qs(query)
+    extra = {k: v for k, v in SQLITE_PRAGMAS.items() if k not in existing}
+    if not extra:
+        return db_url
+    return f"{db_url}{'&' if query else '?'}{urlencode(extra)}"
+
+
+# Trigram-индекс для поиска по названию в PostgreSQL. title__icontains в Tortoise
+# превращается в UPPER(CAST("title" AS VARCHAR)) LIKE UPPER('%...%'), поэтому
+# индекс строится по этому же выражению - иначе планировщик его не использует
+POSTGRES_SEARCH_INDEXES_SQL = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS "idx_recipe_base_title_trgm"
+        ON "recipe_base" USING gin ((UPPER(CAST("title" AS VARCHAR))) gin_trgm_ops);
+"""
+
+
 # Функция для получения конфигурации Tortoise ORM
+@lru_cache(maxsize=8)
 def get_tortoise_config(db_url: str):
-    """Получить конфигурацию Tortoise ORM"""
+    """
+    Получить конфигурацию Tortoise ORM
+
+    Результат кэшируется по db_url и общий для всех вызовов - не изменяйте его.
+    """
     return {
         "connections": {
-            "default": db_url
+            "default": _with_sqlite_pragmas(db_url)
         },
         "apps": {
             "models": {
@@ -135,14 +345,48 @@ TORTOISE_ORM = None
 
 
 # --- Вспомогательные функции инициализации БД ---
-async def init_db(db_url: str):
-    """Инициализация подключения к базе"""
+async def init_db(db_url: str, create_schema: bool = True):
+    """
+    Инициализация подключения к базе
+
+    Args:
+        db_url: URL базы данных
+        create_schema: Создавать недостающие таблицы (generate_schemas).
+            Можно отключить, если схемой управляют миграции Aerich.
+    """
+    from tortoise import Tortoise
+
     global TORTOISE_ORM
     TORTOISE_ORM = get_tortoise_config(db_url)
     await Tortoise.init(config=TORTOISE_ORM)
-    await Tortoise.generate_schemas()
+    if create_schema:
+        await Tortoise.generate_schemas(safe=True)
+        await _create_search_indexes()
+
+
+async def _create_search_indexes():
+    """
+    Индексы, которые generate_schemas не умеет создавать (только PostgreSQL)
+
+    При GENERATE_SCHEMAS=false тот же индекс создает миграция Aerich 7.
+    """
+    from tortoise import Tortoise
+
+    connection = Tortoise.get_connection("default")
+    if connection.capabilities.dialect != "postgres":
+        # В SQLite LIKE '%...%' индексом не ускоряется; таблица рецептов небольшая
+        return
+    try:
+        await connection.execute_script(POSTGRES_SEARCH_INDEXES_SQL)
+    except Exception:
+        # Например, нет прав на CREATE EXTENSION - поиск работает и без индекса
+        logger.warning(
+            "Не удалось создать trigram-индекс для поиска рецептов", exc_info=True
+        )
 
 
 async def close_db():
     """Закрытие подключения к базе"""
+    from tortoise import Tortoise
+
     await Tortoise.close_connections()
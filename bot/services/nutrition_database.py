@@ -4,7 +4,9 @@
 USDA, calorizator.ru, Роспотребнадзор
 """
 
-from typing import Dict, Optional, List
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 
 
 class NutritionDatabase:
@@ -3231,20 +3233,66 @@ class NutritionDatabase:
             "carbs": round(base_nutrition["carbs"] * multiplier, 1),
         }
 
+    def resolve_products(
+        self, product_names: Iterable[str]
+    ) -> Dict[str, Optional[Tuple[str, Dict]]]:
+        """
+        Найти продукты в базе одним проходом, каждое уникальное название - один раз.
+        Если точного продукта нет, берется первый похожий (find_similar_products).
+
+        Returns:
+            {название: (найденное название, КБЖУ на 100г)}
+            или None, если продукт не найден
+        """
+        resolved = {}
+        for product_name in product_names:
+            if product_name in resolved:
+                continue
+            found_name = product_name
+            base_nutrition = self.get_product_nutrition(product_name)
+            if not base_nutrition:
+                similar = self.find_similar_products(product_name, limit=1)
+                if similar:
+                    found_name = similar[0]
+                    base_nutrition = self.get_product_nutrition(found_name)
+            resolved[product_name] = (
+                (found_name, base_nutrition) if base_nutrition else None
+            )
+        return resolved
+
+    def match_product(self, product_name: str) -> Optional[str]:
+        """
+        Первый продукт базы, название которого входит в product_name
+        или содержит его (регистронезависимо)
+        """
+        return _match_product(product_name.lower())
+
     def get_meal_rules(self, meal_name: str) -> Optional[Dict]:
         """Получить правила для конкретного приема пищи"""
         return self.MEAL_RULES.get(meal_name)
 
     def find_similar_products(self, product_name: str, limit: int = 5) -> List[str]:
         """Найти похожие продукты в базе"""
-        product_name_lower = product_name.lower()
-        matches = []
+        return list(islice(_iter_matches(product_name.lower(), self.PRODUCTS), limit))
+
+
+def _iter_matches(
+    product_name_lower: str, product_names: Iterable[str]
+) -> Iterator[str]:
+    """Продукты, название которых входит в искомое или содержит его (по порядку)"""
+    for key in product_names:
+        if product_name_lower in key or key in product_name_lower:
+            yield key
+
+
+# Названия продуктов в порядке словаря - собираем один раз при импорте
+_PRODUCT_NAMES = tuple(NutritionDatabase.PRODUCTS)
 
-        for key in self.PRODUCTS:
-            if product_name_lower in key or key in product_name_lower:
-                matches.append(key)
 
-        return matches[:limit]
+@lru_cache(maxsize=1024)
+def _match_product(product_name_lower: str) -> Optional[str]:
+    """Первое совпадение _iter_matches с кэшем для повторяющихся ингредиентов"""
+    return next(_iter_matches(product_name_lower, _PRODUCT_NAMES), None)
 
 
 # Глобальный экземпляр базы данных
@@ -1,25 +1,454 @@
+import asyncio
 import base64
-import json
+import copy
+import hashlib
 import logging
-from typing import Dict, List, Optional
-from openai import AsyncOpenAI
+import string
+from collections import OrderedDict
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, Iterator, List, NamedTuple, Optional
 
-from bot.core.config import settings
+import httpx
+import orjson
+from openai import APITimeoutError, AsyncOpenAI, AuthenticationError, RateLimitError
+
+from bot.core.config import get_settings
 from bot.services.nutrition_database import nutrition_db
 
 logger = logging.getLogger(__name__)
 
+# Пул соединений к OpenAI: общий на процесс, keep-alive между запросами
+OPENAI_HTTP_LIMITS = httpx.Limits(
+    max_connections=200,
+    max_keepalive_connections=50,
+    keepalive_expiry=60.0,
+)
+OPENAI_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0, pool=5.0)
+
+# Сколько результатов анализа фото держать в памяти (повторные отправки того же фото)
+IMAGE_ANALYSIS_CACHE_SIZE = 128
+# Сколько сгенерированных рецептов держать в памяти
+# (повторные запросы с теми же параметрами)
+RECIPE_CACHE_SIZE = 512
+
+
+def _image_data_url(image_data: bytes) -> str:
+    """
+    data: URL изображения для OpenAI - одна конкатенация байтов
+    и одно ASCII-декодирование
+    """
+    return (b"data:image/jpeg;base64," + base64.b64encode(image_data)).decode("ascii")
+
+
+def _image_digest(image_data: bytes) -> bytes:
+    """Ключ кэша по содержимому изображения"""
+    return hashlib.blake2b(image_data, digest_size=16).digest()
+
+
+# КБЖУ продукта одной строкой (калории, белки, жиры, углеводы)
+_MACROS_GETTER = itemgetter("calories", "protein", "fat", "carbs")
+
+
+class Food(NamedTuple):
+    """Продукт в рационе"""
+    name: str
+    weight_g: float
+
+
+class MealNutrition(NamedTuple):
+    """КБЖУ приема пищи или всего рациона"""
+    calories: float
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+
+
+def _column_sums(rows: List[tuple]) -> tuple:
+    """Суммы по столбцам строк КБЖУ: zip(*rows) + sum вместо += по каждому полю"""
+    if not rows:
+        return (0, 0, 0, 0)
+    return tuple(map(sum, zip(*rows)))
+
+
+# Допустимое превышение калорийности, посчитанной из БЖУ (4/9/4 ккал на грамм),
+# над целевой
+MACROS_CALORIES_TOLERANCE = 1.2
+
+
+def _validate_targets(
+    calories: float,
+    protein: Optional[float],
+    fat: Optional[float],
+    carbs: Optional[float],
+) -> None:
+    """Отсекает заведомо невыполнимые цели до обращения к OpenAI"""
+    if calories <= 0:
+        raise ValueError("Калорийность должна быть больше нуля")
+    macros_calories = 4 * (protein or 0) + 9 * (fat or 0) + 4 * (carbs or 0)
+    if macros_calories > calories * MACROS_CALORIES_TOLERANCE:
+        raise ValueError(
+            f"БЖУ дают около {macros_calories:.0f} ккал, "
+            f"что больше целевых {calories:.0f} ккал"
+        )
+
+
+# --- Текстовое представление рецепта и рациона ---
+
+_RECIPE_WHY_GOOD_HEADER = "💡 *Почему это хороший вариант:*\n"
+_RECIPE_INGREDIENTS_HEADER = "📋 *Ингредиенты:*"
+_RECIPE_STEPS_HEADER = "\n👨‍🍳 *Приготовление:*"
+_RECIPE_NUTRITION_HEADER = "\n📊 *Калорийность и макросы:*"
+_RECIPE_IMAGE_PROMPT_HEADER = "\n🎨 *Промпт для изображения:*\n"
+_MEAL_PLAN_HEADER = "📅 *Рацион питания на день*\n"
+_MEAL_PLAN_TOTAL_HEADER = "📊 *Итого за день:*"
+
+_CALORIES_LINE = "🔥 Калории: {:.0f} ккал".format
+_PROTEIN_LINE = "🥩 Белки: {:.1f} г".format
+_FAT_LINE = "🧈 Жиры: {:.1f} г".format
+_CARBS_LINE = "🍞 Углеводы: {:.1f} г".format
+_MEAL_NUTRITION_LINE = (
+    "  _КБЖУ: {:.0f} ккал, Б: {:.1f}г, Ж: {:.1f}г, У: {:.1f}г_\n".format
+)
+
+
+def _recipe_lines(recipe_data: Dict) -> Iterator[str]:
+    """Строки текста рецепта (см. OpenAIService.format_recipe_response)"""
+    yield f"🍽 *{recipe_data['recipe_title']}*\n"
+    
+    if 'why_good' in recipe_data:
+        yield _RECIPE_WHY_GOOD_HEADER + f"{recipe_data['why_good']}\n"
+    
+    yield _RECIPE_INGREDIENTS_HEADER
+    # Поддерживаем оба формата: ingredients и ingredients_with_weights
+    ingredients = recipe_data.get(
+        'ingredients', recipe_data.get('ingredients_with_weights', [])
+    )
+    for ing in ingredients:
+        name = ing.get('name', '')
+        weight = ing.get('weight_g', '')
+        if not weight:
+            yield f"• {name}"
+            continue
+        note = ing.get('note', '')
+        yield f"• {name}: {weight} г ({note})" if note else f"• {name}: {weight} г"
+    
+    yield _RECIPE_STEPS_HEADER
+    for i, step in enumerate(recipe_data.get('cooking_steps', []), 1):
+        yield f"{i}. {step}"
+    
+    nutrition = recipe_data.get('calculated_nutrition', {})
+    if nutrition:
+        yield _RECIPE_NUTRITION_HEADER
+        yield _CALORIES_LINE(nutrition.get('calories', 0))
+        if 'protein_g' in nutrition:
+            yield _PROTEIN_LINE(nutrition['protein_g'])
+        if 'fat_g' in nutrition:
+            yield _FAT_LINE(nutrition['fat_g'])
+        if 'carbs_g' in nutrition:
+            yield _CARBS_LINE(nutrition['carbs_g'])
+    
+    if 'image_prompt' in recipe_data:
+        yield _RECIPE_IMAGE_PROMPT_HEADER + recipe_data['image_prompt']
+
+
+def _meal_plan_lines(meal_plan_data: Dict) -> Iterator[str]:
+    """Строки текста рациона (см. OpenAIService.format_meal_plan_response)"""
+    yield _MEAL_PLAN_HEADER
+    
+    for meal in meal_plan_data['meals']:
+        yield f"🍽 *{meal['meal_name']}:*"
+        for name, weight_g in meal['foods']:
+            yield f"  • {name} — {weight_g} г"
+        yield _MEAL_NUTRITION_LINE(*meal['nutrition'])
+    
+    calories, protein_g, fat_g, carbs_g = meal_plan_data['calculated_daily_nutrition']
+    yield _MEAL_PLAN_TOTAL_HEADER
+    yield _CALORIES_LINE(calories)
+    yield _PROTEIN_LINE(protein_g)
+    yield _FAT_LINE(fat_g)
+    yield _CARBS_LINE(carbs_g)
+
+
+# --- Промпты (собираются один раз при импорте) ---
+
+_RECIPE_SYSTEM_PROMPT_PHOTO = """Ты профессиональный шеф-повар и нутрициолог.
+Ты готовишь **реалистичные, вкусные и выполнимые рецепты**, \
+без фантазий и ингредиентов, которых нет на фото.
+Твоя задача — создать **один полноценный прием пищи**, а не подборку идей.
+
+Ты:
+* не используешь ингредиенты, которых нет на фото
+* не придумываешь специи, масла, соусы, если их не видно
+* не превышаешь указанные калории
+* пишешь живо, уверенно, по-человечески
+* объясняешь, зачем этот рецепт хороший"""
+
+_RECIPE_SYSTEM_PROMPT_LIST = """Ты профессиональный шеф-повар и нутрициолог.
+Ты готовишь **реалистичные, вкусные и выполнимые рецепты** из указанных ингредиентов.
+Твоя задача — создать **один полноценный прием пищи**, а не подборку идей.
+
+Ты:
+* используешь ТОЛЬКО указанные ингредиенты
+* не придумываешь ингредиенты, которых нет в списке
+* не превышаешь указанные калории
+* пишешь живо, уверенно, по-человечески
+* объясняешь, зачем этот рецепт хороший"""
+
+_RECIPE_MAIN_PROMPT = string.Template("""
+#### Твоя задача:
+
+1. Определи, **какое одно блюдо** логично приготовить из доступных продуктов
+2. Составь **один рецепт**, который максимально близок к заданным параметрам
+3. Сделай рецепт:
+   * сытным
+   * простым
+   * реалистичным для обычной кухни
+4. Не пытайся идеально попасть в КБЖУ, допустимо отклонение ±10%
+
+---
+
+### ФОРМАТ ВЫХОДА (ОБЯЗАТЕЛЬНО)
+
+#### Название блюда
+
+Короткое, аппетитное, без пафоса.
+
+#### Почему это хороший вариант
+
+2–3 предложения. Про сытость, баланс, скорость приготовления.
+
+#### Ингредиенты
+
+$ingredients_instruction
+С примерным весом или количеством.
+
+#### Как готовить
+
+Пошагово.
+Короткие шаги.
+Без воды.
+Без «по желанию».
+
+#### Калорийность и макросы
+
+Примерные значения:
+* Калории
+* Белки
+* Жиры
+* Углеводы
+
+---
+
+### ГЕНЕРАЦИЯ ИЗОБРАЖЕНИЯ (ОТДЕЛЬНЫЙ БЛОК)
+
+После рецепта **отдельно** сгенерируй prompt для изображения готового блюда.
+
+Формат промта для изображения:
+
+Фотореалистичная съемка готового блюда:
+* тип блюда и ключевые ингредиенты
+* подача как в хорошем кафе
+* натуральный свет
+* вид сверху или 45 градусов
+* высокая детализация текстур
+* аппетитный, "хочется съесть" вид
+* без людей, без текста, без логотипов
+
+---
+
+### ВАЖНЫЕ ОГРАНИЧЕНИЯ
+
+* Один рецепт. Не несколько.
+* Никаких советов "можно заменить".
+* Никаких абстракций.
+* $limitations_note
+* Если калории нереалистичны для набора продуктов — честно адаптируй порции.
+
+Верни результат в JSON формате:
+{
+    "recipe_title": "Название блюда",
+    "why_good": "2-3 предложения о том, почему это хороший вариант",
+    "ingredients": [
+        {"name": "Ингредиент", "weight_g": 100, "note": "примерное количество"}
+    ],
+    "cooking_steps": [
+        "Шаг 1",
+        "Шаг 2"
+    ],
+    "calculated_nutrition": {
+        "calories": 500.0,
+        "protein_g": 30.0,
+        "fat_g": 20.0,
+        "carbs_g": 40.0
+    },
+    "image_prompt": "Детальный промпт для генерации изображения готового блюда"
+}
+""")
+
+_RECIPE_MAIN_PROMPT_PHOTO = _RECIPE_MAIN_PROMPT.substitute(
+    ingredients_instruction="Список только из того, что видно на фото.",
+    limitations_note="Если данных по БЖУ нет — ориентируйся только на калории и фото.",
+)
+_RECIPE_MAIN_PROMPT_LIST = _RECIPE_MAIN_PROMPT.substitute(
+    ingredients_instruction="Список только из указанных ингредиентов.",
+    limitations_note=(
+        "Если данных по БЖУ нет — ориентируйся только на калории "
+        "и список ингредиентов."
+    ),
+)
+
+# Вся неизменная часть (роль, задача, формат ответа) - в system-сообщении: одинаковый
+# префикс запросов попадает в prompt caching OpenAI, в user остаются только параметры
+_RECIPE_INSTRUCTIONS_PHOTO = (
+    _RECIPE_SYSTEM_PROMPT_PHOTO + "\n" + _RECIPE_MAIN_PROMPT_PHOTO
+)
+_RECIPE_INSTRUCTIONS_LIST = _RECIPE_SYSTEM_PROMPT_LIST + "\n" + _RECIPE_MAIN_PROMPT_LIST
+
+_MEAL_PLAN_PROMPT = string.Template("""
+        Ты профессиональный диетолог. Составь СБАЛАНСИРОВАННЫЙ рацион питания на день.
+        
+        ДОСТУПНЫЕ ПРОДУКТЫ (используй ТОЛЬКО эти названия!):
+        $products_text
+        
+        Целевые показатели ЗА ВЕСЬ ДЕНЬ:
+        - Калории: $target_daily_calories ккал
+        - Белки: $target_daily_protein г
+        - Жиры: $target_daily_fat г
+        - Углеводы: $target_daily_carbs г
+        - Овощи/фрукты: $daily_greens_weight г
+        
+        Количество приемов пищи: $meals_count ($meal_names)
+        
+        ПРАВИЛА для каждого приема пищи:
+        $meal_rules_text
+        
+        КРИТИЧЕСКИ ВАЖНО:
+        0. ИСПОЛЬЗУЙ ТОЛЬКО ТОЧНЫЕ НАЗВАНИЯ ПРОДУКТОВ ИЗ СПИСКА ВЫШЕ!
+           ❌ НЕЛЬЗЯ писать: "жареная курица", "салат с овощами", "жёлтый перец"
+           ✅ МОЖНО писать только: "курица грудка", "помидоры", "перец болгарский"
+        
+        1. Завтрак: ОБЯЗАТЕЛЬНО белок + сложные углеводы (каша/хлеб) + овощи
+           ❌ НЕЛЬЗЯ: только яйца и салат, яйца с фруктами без каши
+           ✅ МОЖНО: яйца + овсянка + огурцы, творог + хлеб + помидоры
+        
+        2. Обед: ОБЯЗАТЕЛЬНО белок + гарнир (рис/гречка/макароны) + овощной салат
+           ❌ НЕЛЬЗЯ: только мясо с овощами без гарнира
+           ✅ МОЖНО: курица + рис + салат из овощей
+        
+        3. Ужин: ОБЯЗАТЕЛЬНО белок + много овощей, МИНИМУМ углеводов
+           ❌ НЕЛЬЗЯ: фрукты, сладкое, много каши
+           ✅ МОЖНО: рыба + тушеные овощи, творог + огурцы
+        
+        4. Сочетай продукты ЛОГИЧНО (как в ресторане):
+           ❌ НЕЛЬЗЯ: яйца + малина, арбуз + лук + черника, курица + ананас
+           ✅ МОЖНО: яйца + огурцы + хлеб, салат из огурцов и помидоров
+        
+        5. Распредели калории грамотно:
+           - Завтрак: 25-30% от дневной нормы
+           - Обед: 35-40% от дневной нормы
+           - Ужин: 20-25% от дневной нормы
+           - Перекусы: 5-10% каждый
+        
+        6. НАЗВАНИЯ ПРОДУКТОВ:
+           - Копируй названия ТОЧНО из списка доступных продуктов
+           - НЕ добавляй слова "жареный", "запеченный", "салат из"
+           - НЕ объединяй несколько продуктов в один (типа "салат с овощами")
+           - Каждый продукт отдельной строкой!
+        
+        Верни результат в JSON:
+        {
+            "meals": [
+                {
+                    "meal_name": "Завтрак",
+                    "foods": [
+                        {"name": "яйца куриные", "weight_g": 100},
+                        {"name": "овсянка", "weight_g": 50},
+                        {"name": "огурцы", "weight_g": 100}
+                    ]
+                }
+            ]
+        }
+        
+        Будь профессионалом! Создавай РЕАЛЬНЫЕ сочетания продуктов, \
+как в настоящем меню!
+        """)
+
+# Названия приемов пищи для 1..6 приемов в день
+_MEAL_NAMES = (
+    ("Прием пищи",),
+    ("Первый прием", "Второй прием"),
+    ("Завтрак", "Обед", "Ужин"),
+    ("Завтрак", "Обед", "Полдник", "Ужин"),
+    ("Завтрак", "Второй завтрак", "Обед", "Полдник", "Ужин"),
+    ("Завтрак", "Второй завтрак", "Обед", "Полдник", "Ужин", "Поздний ужин"),
+)
+
+
+def _meal_names(meals_count: int) -> tuple:
+    """Названия приемов пищи; для нестандартного количества - «Прием N»"""
+    if 1 <= meals_count <= len(_MEAL_NAMES):
+        return _MEAL_NAMES[meals_count - 1]
+    return tuple(f"Прием {i+1}" for i in range(meals_count))
+
+
+@lru_cache(maxsize=8)
+def _meal_rules_text(meals_count: int) -> str:
+    """Блок правил по приемам пищи для промпта (зависит только от количества приемов)"""
+    parts = []
+    for meal_name in _meal_names(meals_count):
+        rules = nutrition_db.get_meal_rules(meal_name)
+        if rules:
+            parts.append(f"\n{meal_name}: {rules['description']}\n")
+            parts.append(f"  Примеры: {'; '.join(rules['examples'])}\n")
+    return "".join(parts)
+
 
 class OpenAIService:
     """Сервис для работы с OpenAI API"""
     
-    def __init__(self):
+    def __init__(
+        self, model: Optional[str] = None, meal_plan_model: Optional[str] = None
+    ):
+        settings = get_settings()
+        # Модели можно переопределить (например, для A/B), по умолчанию - из настроек
+        self.model = model or settings.openai_model
+        self.meal_plan_model = meal_plan_model or settings.openai_meal_plan_model
+        self.meal_plan_max_tokens = settings.openai_meal_plan_max_tokens
         # Создаем клиент только если есть API ключ
         if settings.openai_api_key:
-            self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+            self._http_client = httpx.AsyncClient(
+                limits=OPENAI_HTTP_LIMITS,
+                timeout=OPENAI_HTTP_TIMEOUT,
+            )
+            self.client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                http_client=self._http_client,
+                # SDK сам повторяет 429/5xx с экспоненциальной задержкой и Retry-After
+                max_retries=settings.openai_max_retries,
+            )
         else:
+            self._http_client = None
             self.client = None
+        # Результаты analyze_food_image по хэшу изображения (LRU)
+        self._image_analysis_cache: "OrderedDict[bytes, Dict]" = OrderedDict()
+        # Выполняющиеся анализы: одинаковые фото ждут одну общую задачу
+        self._image_analysis_inflight: Dict[bytes, asyncio.Task] = {}
+        # Результаты generate_recipe по набору входных параметров (LRU)
+        self._recipe_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        # Ограничение одновременных запросов к OpenAI
+        self._semaphore = asyncio.Semaphore(settings.openai_max_concurrency)
     
+    async def aclose(self) -> None:
+        """Закрыть пул HTTP соединений (при остановке приложения)"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+
+    async def _create_completion(self, **kwargs):
+        """chat.completions.create с ограничением числа одновременных запросов"""
+        async with self._semaphore:
+            return await self.client.chat.completions.create(**kwargs)
+
     async def analyze_food_image(self, image_data: bytes) -> Dict:
         """
         Анализирует изображение продуктов и возвращает список ингредиентов.
@@ -35,10 +464,50 @@ class OpenAIService:
         if not image_data:
             raise ValueError("image_data не может быть пустым")
         
-        logger.info(f"Анализ изображения, размер: {len(image_data)} байт")
+        logger.info("Анализ изображения, размер: %d байт", len(image_data))
+
+        # То же фото уже анализировали - отдаем сохраненный результат
+        digest = _image_digest(image_data)
+        cached = self._image_analysis_cache.get(digest)
+        if cached is not None:
+            self._image_analysis_cache.move_to_end(digest)
+            logger.info("Результат анализа изображения взят из кэша")
+            return copy.deepcopy(cached)
+
+        # Запрос к OpenAI идет отдельной задачей, общей для всех запросов с тем же
+        # фото. Каждый ждет ее через shield: отмена одного клиента (разрыв
+        # соединения, таймаут) не отменяет запрос и не передается остальным
+        task = self._image_analysis_inflight.get(digest)
+        if task is None:
+            task = asyncio.create_task(self._analyze_and_cache(digest, image_data))
+            self._image_analysis_inflight[digest] = task
+            task.add_done_callback(
+                lambda done: self._forget_image_analysis(digest, done)
+            )
+        else:
+            logger.info("Анализ этого изображения уже выполняется, ожидаем результат")
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _analyze_and_cache(self, digest: bytes, image_data: bytes) -> Dict:
+        """Анализ изображения с сохранением результата в LRU кэш"""
+        result = await self._request_image_analysis(image_data)
+        self._image_analysis_cache[digest] = result
+        if len(self._image_analysis_cache) > IMAGE_ANALYSIS_CACHE_SIZE:
+            self._image_analysis_cache.popitem(last=False)
+        return result
+
+    def _forget_image_analysis(self, digest: bytes, task: asyncio.Task) -> None:
+        """Убрать завершенную задачу из выполняющихся"""
+        if self._image_analysis_inflight.get(digest) is task:
+            del self._image_analysis_inflight[digest]
+        if not task.cancelled():
+            task.exception()  # помечаем ошибку полученной, даже если все ожидающие ушли
+
+    async def _request_image_analysis(self, image_data: bytes) -> Dict:
+        """Запрос анализа изображения к OpenAI"""
         # Кодируем изображение в base64
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-        logger.info(f"Base64 размер: {len(base64_image)} символов")
+        image_url = _image_data_url(image_data)
+        logger.info("Data URL размер: %d символов", len(image_url))
         
         prompt = """
         Проанализируй это изображение продуктов. Определи, что там есть.
@@ -65,8 +534,8 @@ class OpenAIService:
         
         try:
             logger.info("Отправка запроса к OpenAI для анализа изображения")
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",  # Модель с поддержкой изображений
+            response = await self._create_completion(
+                model=self.model,  # Модель с поддержкой изображений
                 messages=[
                     {
                         "role": "user",
@@ -75,7 +544,7 @@ class OpenAIService:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
+                                    "url": image_url
                                 }
                             }
                         ]
@@ -86,30 +555,31 @@ class OpenAIService:
                 timeout=30.0  # Таймаут 30 секунд
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             return result
+        except RateLimitError:
+            # Ошибки OpenAI API различаем по типу исключения SDK
+            raise Exception("Превышен лимит запросов к OpenAI. Попробуй позже.")
+        except APITimeoutError:
+            raise Exception(
+                "Превышено время ожидания ответа от OpenAI. Попробуй еще раз."
+            )
+        except AuthenticationError:
+            raise Exception("Ошибка аутентификации OpenAI API. Проверь настройки.")
         except Exception as e:
-            # Обработка ошибок OpenAI API
-            error_msg = str(e)
-            if "rate_limit" in error_msg.lower():
-                raise Exception("Превышен лимит запросов к OpenAI. Попробуй позже.")
-            elif "timeout" in error_msg.lower():
-                raise Exception("Превышено время ожидания ответа от OpenAI. Попробуй еще раз.")
-            elif "invalid_api_key" in error_msg.lower() or "authentication" in error_msg.lower():
-                raise Exception("Ошибка аутентификации OpenAI API. Проверь настройки.")
-            else:
-                raise Exception(f"Ошибка при обращении к OpenAI: {error_msg}")
+            raise Exception(f"Ошибка при обращении к OpenAI: {e}")
     
     async def generate_recipe(
         self,
-        target_calories: int,
+        target_calories: float,
         image_data: Optional[bytes] = None,
         ingredients: Optional[List[str]] = None,
         target_protein: Optional[float] = None,
         target_fat: Optional[float] = None,
         target_carbs: Optional[float] = None,
         plant_level: Optional[float] = None,
-        cooking_tags: Optional[str] = None
+        cooking_tags: Optional[str] = None,
+        bypass_cache: bool = False
     ) -> Dict:
         """
         Генерирует рецепт на основе фото продуктов и целевых показателей КБЖУ.
@@ -123,6 +593,7 @@ class OpenAIService:
             target_carbs: Целевые углеводы (г, опционально)
             plant_level: Количество растительных ингредиентов или уровень "больше овощей" (опционально)
             cooking_tags: Теги способов приготовления (опционально)
+            bypass_cache: Не брать рецепт из кэша, а сгенерировать новый
             
         Returns:
             Dict с ключами:
@@ -134,35 +605,40 @@ class OpenAIService:
                 - image_prompt: Промпт для генерации изображения готового блюда
         """
         
-        # Системный промпт
-        if image_data:
-            system_prompt = """Ты профессиональный шеф-повар и нутрициолог.
-Ты готовишь **реалистичные, вкусные и выполнимые рецепты**, без фантазий и ингредиентов, которых нет на фото.
-Твоя задача — создать **один полноценный прием пищи**, а не подборку идей.
-
-Ты:
-* не используешь ингредиенты, которых нет на фото
-* не придумываешь специи, масла, соусы, если их не видно
-* не превышаешь указанные калории
-* пишешь живо, уверенно, по-человечески
-* объясняешь, зачем этот рецепт хороший"""
-        else:
-            system_prompt = """Ты профессиональный шеф-повар и нутрициолог.
-Ты готовишь **реалистичные, вкусные и выполнимые рецепты** из указанных ингредиентов.
-Твоя задача — создать **один полноценный прием пищи**, а не подборку идей.
-
-Ты:
-* используешь ТОЛЬКО указанные ингредиенты
-* не придумываешь ингредиенты, которых нет в списке
-* не превышаешь указанные калории
-* пишешь живо, уверенно, по-человечески
-* объясняешь, зачем этот рецепт хороший"""
+        if not image_data and not ingredients:
+            raise ValueError("Нужно передать изображение или список ингредиентов")
+        _validate_targets(target_calories, target_protein, target_fat, target_carbs)
+        
+        # Повторный запрос с теми же параметрами - отдаем сохраненный рецепт.
+        # cooking_tags в промпт не попадают, поэтому и в ключ не входят
+        cache_key = (
+            _image_digest(image_data) if image_data else None,
+            tuple(sorted(ingredients or ())),
+            target_calories,
+            target_protein,
+            target_fat,
+            target_carbs,
+            plant_level,
+        )
+        if not bypass_cache:
+            cached = self._recipe_cache.get(cache_key)
+            if cached is not None:
+                self._recipe_cache.move_to_end(cache_key)
+                logger.info("Рецепт взят из кэша")
+                return copy.deepcopy(cached)
+        
+        # Системный промпт с инструкциями и форматом ответа (собран при импорте модуля)
+        system_prompt = (
+            _RECIPE_INSTRUCTIONS_PHOTO if image_data else _RECIPE_INSTRUCTIONS_LIST
+        )
         
         # Формируем пользовательский промпт
         user_prompt_parts = []
         
         # Добавляем информацию о целевых показателях
-        user_prompt_parts.append(f"Целевая калорийность блюда: {target_calories} ккал")
+        user_prompt_parts.append(
+            f"Целевая калорийность блюда: {target_calories:g} ккал"
+        )
         
         if target_protein is not None and target_protein > 0:
             user_prompt_parts.append(f"Белки: {target_protein} г")
@@ -184,105 +660,6 @@ class OpenAIService:
         
         user_prompt_base = "\n".join(user_prompt_parts)
         
-        # Формируем основной промпт
-        if image_data:
-            ingredients_instruction = "Список только из того, что видно на фото."
-            limitations_note = "Если данных по БЖУ нет — ориентируйся только на калории и фото."
-        else:
-            ingredients_instruction = "Список только из указанных ингредиентов."
-            limitations_note = "Если данных по БЖУ нет — ориентируйся только на калории и список ингредиентов."
-        
-        main_prompt = f"""
-#### Твоя задача:
-
-1. Определи, **какое одно блюдо** логично приготовить из доступных продуктов
-2. Составь **один рецепт**, который максимально близок к заданным параметрам
-3. Сделай рецепт:
-   * сытным
-   * простым
-   * реалистичным для обычной кухни
-4. Не пытайся идеально попасть в КБЖУ, допустимо отклонение ±10%
-
----
-
-### ФОРМАТ ВЫХОДА (ОБЯЗАТЕЛЬНО)
-
-#### Название блюда
-
-Короткое, аппетитное, без пафоса.
-
-#### Почему это хороший вариант
-
-2–3 предложения. Про сытость, баланс, скорость приготовления.
-
-#### Ингредиенты
-
-{ingredients_instruction}
-С примерным весом или количеством.
-
-#### Как готовить
-
-Пошагово.
-Короткие шаги.
-Без воды.
-Без «по желанию».
-
-#### Калорийность и макросы
-
-Примерные значения:
-* Калории
-* Белки
-* Жиры
-* Углеводы
-
----
-
-### ГЕНЕРАЦИЯ ИЗОБРАЖЕНИЯ (ОТДЕЛЬНЫЙ БЛОК)
-
-После рецепта **отдельно** сгенерируй prompt для изображения готового блюда.
-
-Формат промта для изображения:
-
-Фотореалистичная съемка готового блюда:
-* тип блюда и ключевые ингредиенты
-* подача как в хорошем кафе
-* натуральный свет
-* вид сверху или 45 градусов
-* высокая детализация текстур
-* аппетитный, "хочется съесть" вид
-* без людей, без текста, без логотипов
-
----
-
-### ВАЖНЫЕ ОГРАНИЧЕНИЯ
-
-* Один рецепт. Не несколько.
-* Никаких советов "можно заменить".
-* Никаких абстракций.
-* {limitations_note}
-* Если калории нереалистичны для набора продуктов — честно адаптируй порции.
-
-Верни результат в JSON формате:
-{{
-    "recipe_title": "Название блюда",
-    "why_good": "2-3 предложения о том, почему это хороший вариант",
-    "ingredients": [
-        {{"name": "Ингредиент", "weight_g": 100, "note": "примерное количество"}}
-    ],
-    "cooking_steps": [
-        "Шаг 1",
-        "Шаг 2"
-    ],
-    "calculated_nutrition": {{
-        "calories": 500.0,
-        "protein_g": 30.0,
-        "fat_g": 20.0,
-        "carbs_g": 40.0
-    }},
-    "image_prompt": "Детальный промпт для генерации изображения готового блюда"
-}}
-"""
-        
         # Формируем сообщения для API
         messages = [
             {
@@ -294,8 +671,8 @@ class OpenAIService:
         # Формируем контент пользовательского сообщения
         user_content = []
         
-        # Добавляем текстовую часть промпта
-        text_content = f"{user_prompt_base}\n\n{main_prompt}"
+        # Текстовая часть - только параметры этого запроса
+        text_content = user_prompt_base
         
         # Если есть список ингредиентов (для обратной совместимости)
         if ingredients and not image_data:
@@ -306,13 +683,15 @@ class OpenAIService:
         
         # Если есть изображение, добавляем его
         if image_data:
-            logger.info(f"Передача изображения в OpenAI, размер: {len(image_data)} байт")
-            base64_image = base64.b64encode(image_data).decode('utf-8')
-            logger.info(f"Base64 размер: {len(base64_image)} символов")
+            logger.info(
+                "Передача изображения в OpenAI, размер: %d байт", len(image_data)
+            )
+            image_url = _image_data_url(image_data)
+            logger.info("Data URL размер: %d символов", len(image_url))
             user_content.append({
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/jpeg;base64,{base64_image}"
+                    "url": image_url
                 }
             })
             logger.info("Изображение добавлено в запрос к OpenAI")
@@ -328,9 +707,13 @@ class OpenAIService:
             raise Exception("OpenAI клиент не инициализирован. Проверьте настройки API ключа.")
         
         try:
-            logger.info(f"Отправка запроса к OpenAI для генерации рецепта. Передано изображение: {image_data is not None}")
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
+            logger.info(
+                "Отправка запроса к OpenAI для генерации рецепта. "
+                "Передано изображение: %s",
+                image_data is not None,
+            )
+            response = await self._create_completion(
+                model=self.model,
                 messages=messages,
                 response_format={"type": "json_object"},
                 temperature=0.7,
@@ -338,21 +721,27 @@ class OpenAIService:
                 timeout=60.0
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             
             # Обеспечиваем обратную совместимость: добавляем старые поля, если их нет
             if "ingredients_with_weights" not in result and "ingredients" in result:
                 result["ingredients_with_weights"] = result["ingredients"]
-            
-            return result
+        except RateLimitError:
+            raise Exception("Превышен лимит запросов к OpenAI. Попробуй позже.")
+        except APITimeoutError:
+            raise Exception(
+                "Превышено время ожидания ответа от OpenAI. Попробуй еще раз."
+            )
+        except AuthenticationError:
+            raise Exception("Ошибка аутентификации OpenAI API. Проверь настройки.")
         except Exception as e:
-            error_msg = str(e)
-            if "rate_limit" in error_msg.lower():
-                raise Exception("Превышен лимит запросов к OpenAI. Попробуй позже.")
-            elif "timeout" in error_msg.lower():
-                raise Exception("Превышено время ожидания ответа от OpenAI. Попробуй еще раз.")
-            else:
-                raise Exception(f"Ошибка при генерации рецепта: {error_msg}")
+            raise Exception(f"Ошибка при генерации рецепта: {e}")
+        
+        self._recipe_cache[cache_key] = copy.deepcopy(result)
+        self._recipe_cache.move_to_end(cache_key)
+        if len(self._recipe_cache) > RECIPE_CACHE_SIZE:
+            self._recipe_cache.popitem(last=False)
+        return result
     
     @staticmethod
     def format_recipe_response(recipe_data: Dict) -> str:
@@ -365,49 +754,7 @@ class OpenAIService:
         Returns:
             Отформатированный текст рецепта
         """
-        lines = []
-        lines.append(f"🍽 *{recipe_data['recipe_title']}*\n")
-        
-        # Добавляем "Почему это хороший вариант", если есть
-        if 'why_good' in recipe_data:
-            lines.append(f"💡 *Почему это хороший вариант:*\n{recipe_data['why_good']}\n")
-        
-        lines.append("📋 *Ингредиенты:*")
-        # Поддерживаем оба формата: ingredients и ingredients_with_weights
-        ingredients_list = recipe_data.get('ingredients', recipe_data.get('ingredients_with_weights', []))
-        for ing in ingredients_list:
-            name = ing.get('name', '')
-            weight = ing.get('weight_g', '')
-            note = ing.get('note', '')
-            if weight:
-                line = f"• {name}: {weight} г"
-                if note:
-                    line += f" ({note})"
-                lines.append(line)
-            else:
-                lines.append(f"• {name}")
-        
-        lines.append("\n👨‍🍳 *Приготовление:*")
-        cooking_steps = recipe_data.get('cooking_steps', [])
-        for i, step in enumerate(cooking_steps, 1):
-            lines.append(f"{i}. {step}")
-        
-        nutrition = recipe_data.get('calculated_nutrition', {})
-        if nutrition:
-            lines.append("\n📊 *Калорийность и макросы:*")
-            lines.append(f"🔥 Калории: {nutrition.get('calories', 0):.0f} ккал")
-            if 'protein_g' in nutrition:
-                lines.append(f"🥩 Белки: {nutrition['protein_g']:.1f} г")
-            if 'fat_g' in nutrition:
-                lines.append(f"🧈 Жиры: {nutrition['fat_g']:.1f} г")
-            if 'carbs_g' in nutrition:
-                lines.append(f"🍞 Углеводы: {nutrition['carbs_g']:.1f} г")
-        
-        # Добавляем промпт для изображения, если есть
-        if 'image_prompt' in recipe_data:
-            lines.append(f"\n🎨 *Промпт для изображения:*\n{recipe_data['image_prompt']}")
-        
-        return "\n".join(lines)
+        return "\n".join(_recipe_lines(recipe_data))
     
     async def generate_meal_plan(
         self,
@@ -425,123 +772,48 @@ class OpenAIService:
         Использует двухэтапный подход:
         1. GPT выбирает продукты и распределяет их по приемам пищи
         2. Python точно рассчитывает КБЖУ из базы данных
-        """
-        
-        ingredients_text = ", ".join(ingredients)
-        
-        # Определяем названия приемов пищи
-        meal_names = {
-            1: ["Прием пищи"],
-            2: ["Первый прием", "Второй прием"],
-            3: ["Завтрак", "Обед", "Ужин"],
-            4: ["Завтрак", "Обед", "Полдник", "Ужин"],
-            5: ["Завтрак", "Второй завтрак", "Обед", "Полдник", "Ужин"],
-            6: ["Завтрак", "Второй завтрак", "Обед", "Полдник", "Ужин", "Поздний ужин"]
-        }
-        
-        meals_names_list = meal_names.get(meals_count, [f"Прием {i+1}" for i in range(meals_count)])
-        
-        # Получаем список доступных продуктов из базы данных
-        available_products_in_db = list(nutrition_db.PRODUCTS.keys())
-        
-        # Пытаемся сопоставить продукты пользователя с базой данных
-        matched_products = []
-        for ingredient in ingredients:
-            ingredient_lower = ingredient.lower()
-            # Ищем совпадения
-            found = False
-            for db_product in available_products_in_db:
-                if ingredient_lower in db_product or db_product in ingredient_lower:
-                    matched_products.append(db_product)
-                    found = True
-                    break
-            if not found:
-                # Если не нашли, добавляем как есть (будем искать позже)
-                matched_products.append(ingredient)
-        
-        # Формируем список продуктов для промпта
-        products_for_prompt = list(set(matched_products))  # Убираем дубликаты
-        products_text = ", ".join([f'"{p}"' for p in products_for_prompt])
-        
-        # Получаем правила для каждого приема пищи
-        meal_rules_text = ""
-        for meal_name in meals_names_list:
-            rules = nutrition_db.get_meal_rules(meal_name)
-            if rules:
-                meal_rules_text += f"\n{meal_name}: {rules['description']}\n"
-                meal_rules_text += f"  Примеры: {'; '.join(rules['examples'])}\n"
-        
-        prompt = f"""
-        Ты профессиональный диетолог. Составь СБАЛАНСИРОВАННЫЙ рацион питания на день.
-        
-        ДОСТУПНЫЕ ПРОДУКТЫ (используй ТОЛЬКО эти названия!):
-        {products_text}
-        
-        Целевые показатели ЗА ВЕСЬ ДЕНЬ:
-        - Калории: {target_daily_calories} ккал
-        - Белки: {target_daily_protein} г
-        - Жиры: {target_daily_fat} г
-        - Углеводы: {target_daily_carbs} г
-        - Овощи/фрукты: {daily_greens_weight} г
         
-        Количество приемов пищи: {meals_count} ({', '.join(meals_names_list)})
-        
-        ПРАВИЛА для каждого приема пищи:
-        {meal_rules_text}
-        
-        КРИТИЧЕСКИ ВАЖНО:
-        0. ИСПОЛЬЗУЙ ТОЛЬКО ТОЧНЫЕ НАЗВАНИЯ ПРОДУКТОВ ИЗ СПИСКА ВЫШЕ!
-           ❌ НЕЛЬЗЯ писать: "жареная курица", "салат с овощами", "жёлтый перец"
-           ✅ МОЖНО писать только: "курица грудка", "помидоры", "перец болгарский"
-        
-        1. Завтрак: ОБЯЗАТЕЛЬНО белок + сложные углеводы (каша/хлеб) + овощи
-           ❌ НЕЛЬЗЯ: только яйца и салат, яйца с фруктами без каши
-           ✅ МОЖНО: яйца + овсянка + огурцы, творог + хлеб + помидоры
-        
-        2. Обед: ОБЯЗАТЕЛЬНО белок + гарнир (рис/гречка/макароны) + овощной салат
-           ❌ НЕЛЬЗЯ: только мясо с овощами без гарнира
-           ✅ МОЖНО: курица + рис + салат из овощей
-        
-        3. Ужин: ОБЯЗАТЕЛЬНО белок + много овощей, МИНИМУМ углеводов
-           ❌ НЕЛЬЗЯ: фрукты, сладкое, много каши
-           ✅ МОЖНО: рыба + тушеные овощи, творог + огурцы
-        
-        4. Сочетай продукты ЛОГИЧНО (как в ресторане):
-           ❌ НЕЛЬЗЯ: яйца + малина, арбуз + лук + черника, курица + ананас
-           ✅ МОЖНО: яйца + огурцы + хлеб, салат из огурцов и помидоров
-        
-        5. Распредели калории грамотно:
-           - Завтрак: 25-30% от дневной нормы
-           - Обед: 35-40% от дневной нормы
-           - Ужин: 20-25% от дневной нормы
-           - Перекусы: 5-10% каждый
-        
-        6. НАЗВАНИЯ ПРОДУКТОВ:
-           - Копируй названия ТОЧНО из списка доступных продуктов
-           - НЕ добавляй слова "жареный", "запеченный", "салат из"
-           - НЕ объединяй несколько продуктов в один (типа "салат с овощами")
-           - Каждый продукт отдельной строкой!
-        
-        Верни результат в JSON:
-        {{
-            "meals": [
-                {{
-                    "meal_name": "Завтрак",
-                    "foods": [
-                        {{"name": "яйца куриные", "weight_g": 100}},
-                        {{"name": "овсянка", "weight_g": 50}},
-                        {{"name": "огурцы", "weight_g": 100}}
-                    ]
-                }}
-            ]
-        }}
-        
-        Будь профессионалом! Создавай РЕАЛЬНЫЕ сочетания продуктов, как в настоящем меню!
+        Продукты возвращаются как Food, КБЖУ - как MealNutrition;
+        для JSON используйте meal_plan_as_dict.
         """
+        ingredients = [ingredient for ingredient in ingredients if ingredient.strip()]
+        if not ingredients:
+            raise ValueError("Список продуктов пуст")
+        if meals_count <= 0:
+            raise ValueError("Количество приемов пищи должно быть больше нуля")
+        _validate_targets(
+            target_daily_calories,
+            target_daily_protein,
+            target_daily_fat,
+            target_daily_carbs,
+        )
+        
+        # Пытаемся сопоставить продукты пользователя с базой данных;
+        # если не нашли, добавляем как есть (будем искать позже)
+        matched_products = [
+            nutrition_db.match_product(ingredient) or ingredient
+            for ingredient in ingredients
+        ]
+        
+        # Формируем список продуктов для промпта: убираем дубликаты,
+        # сохраняя порядок, в котором их указал пользователь
+        products_text = ", ".join(f'"{p}"' for p in dict.fromkeys(matched_products))
+        
+        prompt = _MEAL_PLAN_PROMPT.substitute(
+            products_text=products_text,
+            target_daily_calories=target_daily_calories,
+            target_daily_protein=target_daily_protein,
+            target_daily_fat=target_daily_fat,
+            target_daily_carbs=target_daily_carbs,
+            daily_greens_weight=daily_greens_weight,
+            meals_count=meals_count,
+            meal_names=", ".join(_meal_names(meals_count)),
+            meal_rules_text=_meal_rules_text(meals_count),
+        )
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
+            response = await self._create_completion(
+                model=self.meal_plan_model,
                 messages=[
                     {
                         "role": "system",
@@ -559,104 +831,98 @@ class OpenAIService:
                 ],
                 response_format={"type": "json_object"},
                 temperature=0.3,  # Снизили температуру для более предсказуемых результатов
-                max_tokens=2000,
+                max_tokens=self.meal_plan_max_tokens,
                 timeout=60.0  # Таймаут 60 секунд
             )
             
-            gpt_result = json.loads(response.choices[0].message.content)
+            gpt_result = orjson.loads(response.choices[0].message.content)
+        except RateLimitError:
+            raise Exception("Превышен лимит запросов к OpenAI. Попробуй позже.")
+        except APITimeoutError:
+            raise Exception(
+                "Превышено время ожидания ответа от OpenAI. Попробуй еще раз."
+            )
+        except AuthenticationError:
+            raise Exception("Ошибка аутентификации OpenAI API. Проверь настройки.")
         except Exception as e:
-            error_msg = str(e)
-            if "rate_limit" in error_msg.lower():
-                raise Exception("Превышен лимит запросов к OpenAI. Попробуй позже.")
-            elif "timeout" in error_msg.lower():
-                raise Exception("Превышено время ожидания ответа от OpenAI. Попробуй еще раз.")
-            else:
-                raise Exception(f"Ошибка при генерации плана питания: {error_msg}")
-        
-        # Теперь ТОЧНО рассчитываем КБЖУ из нашей базы данных
+            raise Exception(f"Ошибка при генерации плана питания: {e}")
+        
+        # Теперь ТОЧНО рассчитываем КБЖУ из нашей базы данных; расчёт синхронный,
+        # поэтому уводим его в поток, чтобы не блокировать event loop
+        return await asyncio.to_thread(self._compute_nutrition, gpt_result)
+    
+    @staticmethod
+    def _compute_nutrition(gpt_result: Dict) -> Dict:
+        """Рассчитывает КБЖУ рациона по базе продуктов."""
+        meals = gpt_result.get("meals", [])
+        # Все продукты рациона ищем в базе разом: повторяющиеся названия - один поиск
+        resolved = nutrition_db.resolve_products(
+            food["name"] for meal in meals for food in meal.get("foods", [])
+        )
+        for product_name, match in resolved.items():
+            if match is None:
+                logger.error("Продукт '%s' пропущен (не найден в базе)", product_name)
+            elif match[0] != product_name:
+                logger.warning(
+                    "Продукт '%s' не найден, используем '%s'", product_name, match[0]
+                )
+        
         meals_with_nutrition = []
-        total_calories = 0
-        total_protein = 0
-        total_fat = 0
-        total_carbs = 0
-        
-        for meal in gpt_result.get("meals", []):
-            meal_calories = 0
-            meal_protein = 0
-            meal_fat = 0
-            meal_carbs = 0
+        meal_totals = []
+        
+        for meal in meals:
+            # Строки (калории, белки, жиры, углеводы) по каждому продукту
+            food_rows = []
             
             foods_with_nutrition = []
             for food in meal.get("foods", []):
-                product_name = food["name"]
                 weight_g = food["weight_g"]
+                match = resolved[food["name"]]
                 
-                # Получаем точное КБЖУ из базы данных
-                nutrition = nutrition_db.calculate_nutrition(product_name, weight_g)
-                
-                if nutrition:
-                    meal_calories += nutrition["calories"]
-                    meal_protein += nutrition["protein"]
-                    meal_fat += nutrition["fat"]
-                    meal_carbs += nutrition["carbs"]
-                    
-                    foods_with_nutrition.append({
-                        "name": product_name,
-                        "weight_g": weight_g
-                    })
+                if match:
+                    product_name, base_nutrition = match
+                    multiplier = weight_g / 100.0
+                    food_rows.append(tuple(
+                        round(value * multiplier, 1)
+                        for value in _MACROS_GETTER(base_nutrition)
+                    ))
+                    foods_with_nutrition.append(Food(product_name, weight_g))
                 else:
-                    # Если продукт не найден в базе, пытаемся найти похожие
-                    similar = nutrition_db.find_similar_products(product_name, limit=1)
-                    if similar:
-                        logger.warning(f"Продукт '{product_name}' не найден, используем '{similar[0]}'")
-                        nutrition = nutrition_db.calculate_nutrition(similar[0], weight_g)
-                        if nutrition:
-                            meal_calories += nutrition["calories"]
-                            meal_protein += nutrition["protein"]
-                            meal_fat += nutrition["fat"]
-                            meal_carbs += nutrition["carbs"]
-                            
-                            foods_with_nutrition.append({
-                                "name": similar[0],
-                                "weight_g": weight_g
-                            })
-                        else:
-                            logger.error(f"Продукт '{product_name}' пропущен (не найден в базе)")
-                            foods_with_nutrition.append({
-                                "name": product_name + " (не найден в БД)",
-                                "weight_g": weight_g
-                            })
-                    else:
-                        logger.error(f"Продукт '{product_name}' пропущен (не найден в базе)")
-                        foods_with_nutrition.append({
-                            "name": product_name + " (не найден в БД)",
-                            "weight_g": weight_g
-                        })
+                    foods_with_nutrition.append(
+                        Food(food["name"] + " (не найден в БД)", weight_g)
+                    )
             
-            total_calories += meal_calories
-            total_protein += meal_protein
-            total_fat += meal_fat
-            total_carbs += meal_carbs
+            meal_sums = _column_sums(food_rows)
+            meal_totals.append(meal_sums)
             
             meals_with_nutrition.append({
                 "meal_name": meal["meal_name"],
                 "foods": foods_with_nutrition,
-                "nutrition": {
-                    "calories": round(meal_calories, 1),
-                    "protein_g": round(meal_protein, 1),
-                    "fat_g": round(meal_fat, 1),
-                    "carbs_g": round(meal_carbs, 1)
-                }
+                "nutrition": MealNutrition._make(round(value, 1) for value in meal_sums)
             })
         
         return {
             "meals": meals_with_nutrition,
-            "calculated_daily_nutrition": {
-                "calories": round(total_calories, 1),
-                "protein_g": round(total_protein, 1),
-                "fat_g": round(total_fat, 1),
-                "carbs_g": round(total_carbs, 1)
-            }
+            "calculated_daily_nutrition": MealNutrition._make(
+                round(value, 1) for value in _column_sums(meal_totals)
+            )
+        }
+    
+    @staticmethod
+    def meal_plan_as_dict(meal_plan_data: Dict) -> Dict:
+        """Рацион из generate_meal_plan в виде словарей (для сериализации в JSON)"""
+        return {
+            "meals": [
+                {
+                    "meal_name": meal["meal_name"],
+                    "foods": [food._asdict() for food in meal["foods"]],
+                    "nutrition": meal["nutrition"]._asdict(),
+                }
+                for meal in meal_plan_data["meals"]
+            ],
+            "calculated_daily_nutrition": (
+                meal_plan_data["calculated_daily_nutrition"]._asdict()
+            ),
         }
     
     @staticmethod
@@ -670,32 +936,7 @@ class OpenAIService:
         Returns:
             Отформатированный текст рациона
         """
-        lines = []
-        lines.append("📅 *Рацион питания на день*\n")
-        
-        for meal in meal_plan_data['meals']:
-            lines.append(f"🍽 *{meal['meal_name']}:*")
-            for food in meal['foods']:
-                lines.append(f"  • {food['name']} — {food['weight_g']} г")
-            
-            # КБЖУ приема пищи
-            nutrition = meal['nutrition']
-            lines.append(
-                f"  _КБЖУ: {nutrition['calories']:.0f} ккал, "
-                f"Б: {nutrition['protein_g']:.1f}г, "
-                f"Ж: {nutrition['fat_g']:.1f}г, "
-                f"У: {nutrition['carbs_g']:.1f}г_\n"
-            )
-        
-        # Итоговое КБЖУ за день
-        daily_nutrition = meal_plan_data['calculated_daily_nutrition']
-        lines.append("📊 *Итого за день:*")
-        lines.append(f"🔥 Калории: {daily_nutrition['calories']:.0f} ккал")
-        lines.append(f"🥩 Белки: {daily_nutrition['protein_g']:.1f} г")
-        lines.append(f"🧈 Жиры: {daily_nutrition['fat_g']:.1f} г")
-        lines.append(f"🍞 Углеводы: {daily_nutrition['carbs_g']:.1f} г")
-        
-        return "\n".join(lines)
+        return "\n".join(_meal_plan_lines(meal_plan_data))
 
 
 # Глобальный экземпляр сервиса
@@ -2,9 +2,16 @@
 Поиск рецептов по КБЖУ
 """
 
+import math
 from typing import List, Optional
+
+from tortoise.expressions import RawSQL
+
 from bot.core.models import RecipeBase
 
+# Верхняя граница SMALLINT: КБЖУ в десятых долях не может быть больше
+_X10_MAX = 32767
+
 
 async def find_recipes_by_kbzhu(
     target_calories: float,
@@ -28,54 +35,56 @@ async def find_recipes_by_kbzhu(
     Returns:
         Список рецептов, отсортированных по близости к целевым значениям
     """
-    # Получаем все рецепты
-    all_recipes = await RecipeBase.all()
-
-    if not all_recipes:
+    # Цели подставляются в SQL числами: inf/nan (в т.ч. переполнение при * 10)
+    # дали бы некорректный запрос, а math.ceil(inf) - OverflowError
+    targets = [
+        t
+        for t in (target_calories, target_protein, target_fat, target_carbs)
+        if t is not None
+    ]
+    if not all(math.isfinite(t * 10 * (1 + tolerance)) for t in targets):
+        return []
+    if target_calories <= 0:
         return []
-
-    # Вычисляем "расстояние" до каждого рецепта
-    recipes_with_distance = []
 
     cal_min = target_calories * (1 - tolerance)
     cal_max = target_calories * (1 + tolerance)
+    if cal_min * 10 > _X10_MAX:
+        return []
 
-    for recipe in all_recipes:
-        # Проверяем, входит ли рецепт в диапазон калорий
-        if not (cal_min <= recipe.calories_per_100g <= cal_max):
-            continue
-
-        # Вычисляем "расстояние" (чем меньше, тем ближе к целевым значениям)
-        distance = 0.0
-
-        # Калории (вес 1.0)
-        cal_diff = abs(recipe.calories_per_100g - target_calories) / target_calories
-        distance += cal_diff * 1.0
-
-        # Белки (вес 0.8)
-        if target_protein is not None and target_protein > 0:
-            protein_diff = (
-                abs(recipe.protein_per_100g - target_protein) / target_protein
-            )
-            distance += protein_diff * 0.8
-
-        # Жиры (вес 0.6)
-        if target_fat is not None and target_fat > 0:
-            fat_diff = abs(recipe.fat_per_100g - target_fat) / target_fat
-            distance += fat_diff * 0.6
-
-        # Углеводы (вес 0.7)
-        if target_carbs is not None and target_carbs > 0:
-            carbs_diff = abs(recipe.carbs_per_100g - target_carbs) / target_carbs
-            distance += carbs_diff * 0.7
-
-        recipes_with_distance.append((recipe, distance))
-
-    # Сортируем по расстоянию (меньше = лучше)
-    recipes_with_distance.sort(key=lambda x: x[1])
-
-    # Возвращаем топ N рецептов
-    return [recipe for recipe, _ in recipes_with_distance[:limit]]
+    # "Расстояние" до целевых значений (чем меньше, тем ближе) считает сама БД:
+    # калории (вес 1.0), белки (0.8), жиры (0.6), углеводы (0.7)
+    terms = [_distance_term("calories_per_100g_x10", target_calories, 1.0)]
+    for column, target, weight in (
+        ("protein_per_100g_x10", target_protein, 0.8),
+        ("fat_per_100g_x10", target_fat, 0.6),
+        ("carbs_per_100g_x10", target_carbs, 0.7),
+    ):
+        if target is not None and target > 0:
+            terms.append(_distance_term(column, target, weight))
+
+    # Из БД приходят только limit ближайших рецептов из диапазона калорий
+    return await (
+        RecipeBase.filter(
+            calories_per_100g_x10__gte=math.ceil(cal_min * 10),
+            calories_per_100g_x10__lte=math.floor(cal_max * 10),
+        )
+        .annotate(distance=RawSQL(" + ".join(terms)))
+        .order_by("distance", "-created_at")
+        .limit(limit)
+        .prefetch_related("tags")
+    )
+
+
+def _distance_term(column: str, target: float, weight: float) -> str:
+    """
+    Слагаемое расстояния в SQL: weight * |значение - цель| / цель.
+    КБЖУ хранится в десятых долях, поэтому цель тоже умножается на 10.
+    Tortoise не передает параметры в аннотации, поэтому в SQL попадает repr
+    числа: вызывающий код гарантирует, что target * 10 конечно
+    """
+    target_x10 = float(target) * 10
+    return f'{float(weight)!r} * ABS("{column}" - {target_x10!r}) / {target_x10!r}'
 
 
 async def find_recipes_by_tags(tags: List[str], limit: int = 10) -> List[RecipeBase]:
@@ -89,23 +98,17 @@ async def find_recipes_by_tags(tags: List[str], limit: int = 10) -> List[RecipeB
     Returns:
         Список рецептов
     """
-    recipes = []
-
-    for tag in tags:
-        # Ищем рецепты, содержащие тег (регистронезависимо)
-        found = await RecipeBase.filter(tags__icontains=tag).limit(limit)
-        recipes.extend(found)
-
-    # Убираем дубликаты
-    unique_recipes = []
-    seen_ids = set()
-
-    for recipe in recipes:
-        if recipe.id not in seen_ids:
-            unique_recipes.append(recipe)
-            seen_ids.add(recipe.id)
+    names = list(dict.fromkeys(t.strip().lower() for t in tags if t.strip()))
+    if not names:
+        return []
 
-    return unique_recipes[:limit]
+    # Один запрос по индексированной таблице тегов
+    return await (
+        RecipeBase.filter(tags__name__in=names)
+        .distinct()
+        .limit(limit)
+        .prefetch_related("tags")
+    )
 
 
 async def find_recipes_by_title(query: str, limit: int = 10) -> List[RecipeBase]:
@@ -119,7 +122,9 @@ async def find_recipes_by_title(query: str, limit: int = 10) -> List[RecipeBase]
     Returns:
         Список рецептов
     """
-    return await RecipeBase.filter(title__icontains=query).limit(limit)
+    return await (
+        RecipeBase.filter(title__icontains=query).limit(limit).prefetch_related("tags")
+    )
 
 
 async def get_random_recipes(limit: int = 5) -> List[RecipeBase]:
@@ -132,16 +137,14 @@ async def get_random_recipes(limit: int = 5) -> List[RecipeBase]:
     Returns:
         Список случайных рецептов
     """
-    # Tortoise ORM не поддерживает RANDOM() напрямую
-    # Получаем все рецепты и выбираем случайные
-    import random
-
-    all_recipes = await RecipeBase.all()
-
-    if len(all_recipes) <= limit:
-        return all_recipes
-
-    return random.sample(all_recipes, limit)
+    # Выборку делает БД (RANDOM() есть и в SQLite, и в PostgreSQL):
+    # из базы приходят только limit строк, а не вся таблица
+    return await (
+        RecipeBase.annotate(random_order=RawSQL("RANDOM()"))
+        .order_by("random_order")
+        .limit(limit)
+        .prefetch_related("tags")
+    )
 
 
 def format_recipe_for_display(recipe: RecipeBase) -> str:
@@ -156,8 +159,8 @@ def format_recipe_for_display(recipe: RecipeBase) -> str:
     """
     text = f"🍽 <b>{recipe.title}</b>\n\n"
 
-    if recipe.tags:
-        text += f"🏷 Теги: {recipe.tags}\n"
+    if recipe.tags_text:
+        text += f"🏷 Теги: {recipe.tags_text}\n"
 
     if recipe.cooking_time:
         text += f"⏱ Время: {recipe.cooking_time}\n"
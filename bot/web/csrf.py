@@ -2,6 +2,7 @@
 CSRF защита для форм
 """
 
+import hmac
 import secrets
 from fastapi import Request, HTTPException, status
 from fastapi.responses import Response
@@ -31,13 +32,24 @@ def set_csrf_token(response: Response, token: str):
     )
 
 
-def validate_csrf_token(request: Request, token: Optional[str] = None) -> bool:
+def verify_csrf(submitted: str, expected: str) -> bool:
+    """
+    Сравнивает токены за постоянное время
+
+    Сравниваются байты: compare_digest на str падает с TypeError
+    для не-ASCII символов, которые может прислать клиент
+    """
+    return hmac.compare_digest(submitted.encode(), expected.encode())
+
+
+async def validate_csrf_token(request: Request, token: Optional[str] = None) -> bool:
     """
     Проверяет CSRF токен
     
     Args:
         request: Request объект
-        token: Токен из формы (если None, берется из заголовка X-CSRF-Token)
+        token: Токен из формы (если None, берется из заголовка X-CSRF-Token,
+            а если нет и его - из поля csrf_token формы)
     
     Returns:
         True если токен валиден, False иначе
@@ -47,24 +59,23 @@ def validate_csrf_token(request: Request, token: Optional[str] = None) -> bool:
     if not cookie_token:
         return False
     
-    # Получаем токен из формы или заголовка
+    # Получаем токен из заголовка, тело читаем только если его нет
     if token is None:
-        # Пробуем получить из заголовка
         token = request.headers.get("X-CSRF-Token")
         if not token:
-            # Пробуем получить из формы
-            form_data = request.form()
-            if hasattr(form_data, 'get'):
-                token = form_data.get("csrf_token")
+            # Starlette кэширует разобранную форму в request - если эндпоинт
+            # уже получил Form-поля, повторного разбора тела не будет
+            form_data = await request.form()
+            token = form_data.get("csrf_token")
     
     if not token:
         return False
     
     # Сравниваем токены
-    return secrets.compare_digest(cookie_token, token)
+    return verify_csrf(token, cookie_token)
 
 
-def require_csrf_token(request: Request, token: Optional[str] = None):
+async def require_csrf_token(request: Request, token: Optional[str] = None):
     """
     Проверяет CSRF токен и выбрасывает исключение если невалиден
     
@@ -75,7 +86,7 @@ def require_csrf_token(request: Request, token: Optional[str] = None):
     Raises:
         HTTPException: Если токен невалиден
     """
-    if not validate_csrf_token(request, token):
+    if not await validate_csrf_token(request, token):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid CSRF token"
@@ -46,15 +46,13 @@ def get_flash_message(request: Request) -> Optional[tuple[str, str]]:
     Returns:
         Tuple (message, type) или None
     """
-    encoded_message = request.cookies.get("flash_message")
-    encoded_type = request.cookies.get("flash_type", "success")
+    cookies = request.cookies
+    encoded_message = cookies.get("flash_message")
+    if not encoded_message:
+        return None
     
-    if encoded_message:
-        # Декодируем сообщение из URL-safe формата
-        message = unquote(encoded_message)
-        message_type = unquote(encoded_type)
-        return (message, message_type)
-    return None
+    # Декодируем сообщение из URL-safe формата
+    return (unquote(encoded_message), unquote(cookies.get("flash_type", "success")))
 
 
 def clear_flash_message(response: Response):
@@ -2,15 +2,26 @@
 API endpoints для генерации рецептов
 """
 
-from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
+from fastapi import (
+    APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request,
+    Response,
+)
 from fastapi.responses import JSONResponse
-from typing import Optional, List
+from typing import Dict, NamedTuple, Optional, List
 from pydantic import BaseModel
-import json
-import os
-from pathlib import Path
-
-from bot.core.models import Recipe, RecipeBase
+import base64
+import binascii
+import hashlib
+import orjson
+import time
+from collections import OrderedDict
+from datetime import datetime
+from operator import attrgetter
+from tortoise.exceptions import DoesNotExist
+from tortoise.expressions import Q
+
+from bot.core.config import get_settings
+from bot.core.models import Recipe, RecipeBase, Tag
 from bot.services.openai_service import openai_service
 from bot.services.recipe_search import (
     find_recipes_by_kbzhu,
@@ -18,12 +29,16 @@ from bot.services.recipe_search import (
     find_recipes_by_title,
     get_random_recipes
 )
+from bot.web.uploads import image_extension, read_upload_limited
 
 router = APIRouter(prefix="/api/v1", tags=["api"])
 
-# Директория для загрузки изображений
-UPLOAD_DIR = Path("static/uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Кэш страниц списка общей базы (LRU с TTL). Рецепты добавляются
+# скриптами импорта в другом процессе, поэтому устаревание - только по TTL
+BASE_RECIPES_CACHE_TTL = 30.0
+BASE_RECIPES_CACHE_SIZE = 256
+# Максимальный размер страницы списка общей базы
+BASE_RECIPES_PAGE_MAX = 100
 
 
 # --- Pydantic модели для валидации ---
@@ -70,6 +85,24 @@ class MealPlanResponse(BaseModel):
         from_attributes = True
 
 
+# Атрибуты RecipeBase для ответа - одним вызовом attrgetter
+_RECIPE_BASE_GETTER = attrgetter(
+    "id",
+    "title",
+    "tags_text",
+    "cooking_time",
+    "difficulty",
+    "calories_per_100g",
+    "protein_per_100g",
+    "fat_per_100g",
+    "carbs_per_100g",
+    "ingredients",
+    "instructions",
+    "notes",
+    "created_at",
+)
+
+
 class RecipeBaseResponse(BaseModel):
     """Модель ответа для рецепта из общей базы"""
     id: str
@@ -89,133 +122,313 @@ class RecipeBaseResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @classmethod
+    def from_recipe(cls, recipe: RecipeBase) -> "RecipeBaseResponse":
+        """
+        Ответ из строки БД без повторной валидации
+
+        Поля уже типизированы Tortoise, поэтому model_construct
+        не гоняет валидатор pydantic на каждой строке списка
+        """
+        (
+            recipe_id, title, tags, cooking_time, difficulty,
+            calories, protein, fat, carbs,
+            ingredients, instructions, notes, created_at,
+        ) = _RECIPE_BASE_GETTER(recipe)
+        return cls.model_construct(
+            id=str(recipe_id),
+            title=title,
+            tags=tags,
+            cooking_time=cooking_time,
+            difficulty=difficulty,
+            calories_per_100g=calories,
+            protein_per_100g=protein,
+            fat_per_100g=fat,
+            carbs_per_100g=carbs,
+            ingredients=ingredients,
+            instructions=instructions,
+            notes=notes,
+            created_at=created_at.isoformat() if created_at else "",
+        )
+
+    @classmethod
+    def from_row(cls, row: dict, tags: Optional[str]) -> "RecipeBaseResponse":
+        """Ответ из словаря values() (КБЖУ в десятых долях)"""
+        return cls.model_construct(
+            id=str(row["id"]),
+            title=row["title"],
+            tags=tags,
+            cooking_time=row["cooking_time"],
+            difficulty=row["difficulty"],
+            calories_per_100g=row["calories_per_100g_x10"] / 10,
+            protein_per_100g=row["protein_per_100g_x10"] / 10,
+            fat_per_100g=row["fat_per_100g_x10"] / 10,
+            carbs_per_100g=row["carbs_per_100g_x10"] / 10,
+            ingredients=row["ingredients"],
+            instructions=row["instructions"],
+            notes=row["notes"],
+            created_at=row["created_at"].isoformat() if row["created_at"] else "",
+        )
+
+
+class RecipeSearchForm(BaseModel):
+    """Поля формы поиска по общей базе"""
+    search_type: str
+    query: Optional[str] = None
+    calories: Optional[float] = None
+    protein: Optional[float] = None
+    fat: Optional[float] = None
+    carbs: Optional[float] = None
+    tags: Optional[str] = None
+
+    @classmethod
+    def as_form(
+        cls,
+        search_type: str = Form(...),
+        query: Optional[str] = Form(None),
+        calories: Optional[float] = Form(None),
+        protein: Optional[float] = Form(None),
+        fat: Optional[float] = Form(None),
+        carbs: Optional[float] = Form(None),
+        tags: Optional[str] = Form(None),
+    ) -> "RecipeSearchForm":
+        """Зависимость FastAPI: типы полей уже проверены при разборе формы"""
+        return cls.model_construct(
+            search_type=search_type,
+            query=query,
+            calories=calories,
+            protein=protein,
+            fat=fat,
+            carbs=carbs,
+            tags=tags,
+        )
+
+
+# Верхние границы необязательных параметров генерации: (поле, максимум, ошибка)
+_GENERATE_RECIPE_BOUNDS = (
+    ("target_protein", 1000, "Белки должны быть от 0 до 1000 г"),
+    ("target_fat", 1000, "Жиры должны быть от 0 до 1000 г"),
+    ("target_carbs", 1000, "Углеводы должны быть от 0 до 1000 г"),
+    ("greens_weight", 2000, "Вес растительности должен быть от 0 до 2000 г"),
+)
+
+
+class GenerateRecipeForm(BaseModel):
+    """Поля формы генерации рецепта (кроме фото)"""
+    clarifications: str = ""
+    target_calories: float
+    target_protein: float = 0
+    target_fat: float = 0
+    target_carbs: float = 0
+    greens_weight: float = 0
+    cooking_tags: str = ""
+    # Сгенерировать новый вариант, а не брать рецепт из кэша
+    regenerate: bool = False
+
+    @classmethod
+    def as_form(
+        cls,
+        clarifications: str = Form(""),
+        target_calories: float = Form(...),
+        target_protein: float = Form(0),
+        target_fat: float = Form(0),
+        target_carbs: float = Form(0),
+        greens_weight: float = Form(0),
+        cooking_tags: str = Form(""),
+        regenerate: bool = Form(False),
+    ) -> "GenerateRecipeForm":
+        """Зависимость FastAPI: типы полей уже проверены при разборе формы"""
+        return cls.model_construct(
+            clarifications=clarifications,
+            target_calories=target_calories,
+            target_protein=target_protein,
+            target_fat=target_fat,
+            target_carbs=target_carbs,
+            greens_weight=greens_weight,
+            cooking_tags=cooking_tags,
+            regenerate=regenerate,
+        )
+
+    def check_bounds(self) -> None:
+        """
+        Проверить диапазоны КБЖУ и растительности
 
+        Raises:
+            HTTPException: 400 с описанием первого нарушенного диапазона
+        """
+        if not (0 < self.target_calories <= 10000):
+            raise HTTPException(
+                status_code=400, detail="Калории должны быть от 0 до 10000"
+            )
+        # Необязательные параметры проверяются, только если указаны (> 0)
+        for name, limit, detail in _GENERATE_RECIPE_BOUNDS:
+            if getattr(self, name) > limit:
+                raise HTTPException(status_code=400, detail=detail)
 
 
 # --- Общая база рецептов ---
 
+# Колонки recipe_base для ответа списком: словари вместо моделей
+BASE_RECIPE_LIST_FIELDS = (
+    "id",
+    "title",
+    "cooking_time",
+    "difficulty",
+    "calories_per_100g_x10",
+    "protein_per_100g_x10",
+    "fat_per_100g_x10",
+    "carbs_per_100g_x10",
+    "ingredients",
+    "instructions",
+    "notes",
+    "created_at",
+)
+
+
+async def _tags_text_by_recipe(recipe_ids: List[int]) -> Dict[int, str]:
+    """Теги через запятую для набора рецептов одним запросом"""
+    names: Dict[int, List[str]] = {}
+    rows = await Tag.filter(recipes__id__in=recipe_ids).values_list(
+        "recipes__id", "name"
+    )
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+    return {recipe_id: ", ".join(tags) for recipe_id, tags in names.items()}
+
+
+def _encode_cursor(created_at: datetime, recipe_id: int) -> str:
+    """Курсор следующей страницы: (created_at, id) последнего рецепта"""
+    raw = f"{created_at.isoformat()}|{recipe_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Q:
+    """Условие "после курсора" для сортировки по -created_at, -id"""
+    try:
+        created_at, recipe_id = base64.urlsafe_b64decode(cursor).decode().rsplit("|", 1)
+        created_at, recipe_id = datetime.fromisoformat(created_at), int(recipe_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=recipe_id)
+
+
+class _CachedPage(NamedTuple):
+    """Готовая к отдаче страница списка общей базы"""
+    expires_at: float
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+
+
+_base_recipes_cache: "OrderedDict[tuple, _CachedPage]" = OrderedDict()
+
+
+async def _load_base_recipes_page(
+    limit: int, offset: int, cursor: Optional[str]
+) -> _CachedPage:
+    """Запрос страницы и сериализация в JSON (один раз на TTL)"""
+    query = RecipeBase.all()
+    if cursor:
+        query = query.filter(_decode_cursor(cursor))
+    elif offset:
+        query = query.offset(offset)
+    rows = await (
+        query
+        .limit(limit)
+        .order_by("-created_at", "-id")
+        .values(*BASE_RECIPE_LIST_FIELDS)
+    )
+    next_cursor = None
+    if len(rows) == limit and rows:
+        next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    tags = await _tags_text_by_recipe([row["id"] for row in rows]) if rows else {}
+    body = orjson.dumps([
+        RecipeBaseResponse.from_row(row, tags.get(row["id"])).model_dump()
+        for row in rows
+    ])
+    etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    expires_at = time.monotonic() + BASE_RECIPES_CACHE_TTL
+    return _CachedPage(expires_at, body, etag, next_cursor)
+
+
 @router.get("/recipes-base", response_model=List[RecipeBaseResponse])
-async def get_base_recipes(limit: int = 20, offset: int = 0):
-    """Получить список рецептов из общей базы"""
-    recipes = await RecipeBase.all().offset(offset).limit(limit).order_by("-created_at")
-
-    result = []
-    for recipe in recipes:
-        result.append(RecipeBaseResponse(
-            id=str(recipe.id),
-            title=recipe.title,
-            tags=recipe.tags,
-            cooking_time=recipe.cooking_time,
-            difficulty=recipe.difficulty,
-            calories_per_100g=recipe.calories_per_100g,
-            protein_per_100g=recipe.protein_per_100g,
-            fat_per_100g=recipe.fat_per_100g,
-            carbs_per_100g=recipe.carbs_per_100g,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            notes=recipe.notes,
-            created_at=recipe.created_at.isoformat() if recipe.created_at else ""
-        ))
-
-    return result
+async def get_base_recipes(
+    request: Request,
+    # Границы до ключа кэша: limit=0 отдал бы всю таблицу, а произвольные
+    # значения забивали бы кэш разными ключами
+    limit: int = Query(20, ge=1, le=BASE_RECIPES_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+):
+    """
+    Получить список рецептов из общей базы
+
+    Для глубоких страниц передавайте cursor из заголовка X-Next-Cursor
+    предыдущего ответа: БД продолжает с места, а не пропускает offset строк.
+    Страница кэшируется на BASE_RECIPES_CACHE_TTL секунд; по If-None-Match
+    с текущим ETag отдается 304 без тела.
+    """
+    cache_key = (limit, 0 if cursor else offset, cursor)
+    page = _base_recipes_cache.get(cache_key)
+    if page is None or page.expires_at <= time.monotonic():
+        page = await _load_base_recipes_page(limit, offset, cursor)
+        _base_recipes_cache[cache_key] = page
+        if len(_base_recipes_cache) > BASE_RECIPES_CACHE_SIZE:
+            _base_recipes_cache.popitem(last=False)
+    _base_recipes_cache.move_to_end(cache_key)
+
+    headers = {"ETag": page.etag}
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and page.etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
+
+
+# Объявлен до /recipes-base/{recipe_id}, иначе "random" попадает в recipe_id
+@router.get("/recipes-base/random", response_model=List[RecipeBaseResponse])
+async def get_random_base_recipes(limit: int = 5):
+    """Получить случайные рецепты из общей базы"""
+    recipes = await get_random_recipes(limit=limit)
+
+    return [RecipeBaseResponse.from_recipe(recipe) for recipe in recipes]
 
 
 @router.get("/recipes-base/{recipe_id}", response_model=RecipeBaseResponse)
-async def get_base_recipe(recipe_id: str):
+async def get_base_recipe(recipe_id: int):
     """Получить конкретный рецепт из общей базы"""
     try:
-        recipe = await RecipeBase.get(id=recipe_id)
-
-        return RecipeBaseResponse(
-            id=str(recipe.id),
-            title=recipe.title,
-            tags=recipe.tags,
-            cooking_time=recipe.cooking_time,
-            difficulty=recipe.difficulty,
-            calories_per_100g=recipe.calories_per_100g,
-            protein_per_100g=recipe.protein_per_100g,
-            fat_per_100g=recipe.fat_per_100g,
-            carbs_per_100g=recipe.carbs_per_100g,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            notes=recipe.notes,
-            created_at=recipe.created_at.isoformat() if recipe.created_at else ""
-        )
-    except RecipeBase.DoesNotExist:
+        recipe = await RecipeBase.get(id=recipe_id).prefetch_related("tags")
+
+        return RecipeBaseResponse.from_recipe(recipe)
+    except DoesNotExist:
         raise HTTPException(status_code=404, detail="Рецепт не найден в базе")
 
 
 @router.post("/recipes-base/search")
 async def search_base_recipes(
-    search_type: str = Form(...),
-    query: Optional[str] = Form(None),
-    calories: Optional[float] = Form(None),
-    protein: Optional[float] = Form(None),
-    fat: Optional[float] = Form(None),
-    carbs: Optional[float] = Form(None),
-    tags: Optional[str] = Form(None)
+    form: RecipeSearchForm = Depends(RecipeSearchForm.as_form),
 ):
     """Поиск рецептов в общей базе"""
     recipes = []
 
-    if search_type == "kbzhu" and calories:
+    if form.search_type == "kbzhu" and form.calories:
         recipes = await find_recipes_by_kbzhu(
-            target_calories=calories,
-            target_protein=protein,
-            target_fat=fat,
-            target_carbs=carbs
+            target_calories=form.calories,
+            target_protein=form.protein,
+            target_fat=form.fat,
+            target_carbs=form.carbs
         )
-    elif search_type == "tags" and tags:
-        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
+    elif form.search_type == "tags" and form.tags:
+        tag_list = [t.strip() for t in form.tags.split(",") if t.strip()]
         recipes = await find_recipes_by_tags(tag_list)
-    elif search_type == "title" and query:
-        recipes = await find_recipes_by_title(query)
-
-    result = []
-    for recipe in recipes:
-        result.append(RecipeBaseResponse(
-            id=str(recipe.id),
-            title=recipe.title,
-            tags=recipe.tags,
-            cooking_time=recipe.cooking_time,
-            difficulty=recipe.difficulty,
-            calories_per_100g=recipe.calories_per_100g,
-            protein_per_100g=recipe.protein_per_100g,
-            fat_per_100g=recipe.fat_per_100g,
-            carbs_per_100g=recipe.carbs_per_100g,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            notes=recipe.notes,
-            created_at=recipe.created_at.isoformat() if recipe.created_at else ""
-        ))
-
-    return result
+    elif form.search_type == "title" and form.query:
+        recipes = await find_recipes_by_title(form.query)
 
-
-@router.get("/recipes-base/random", response_model=List[RecipeBaseResponse])
-async def get_random_base_recipes(limit: int = 5):
-    """Получить случайные рецепты из общей базы"""
-    recipes = await get_random_recipes(limit=limit)
-
-    result = []
-    for recipe in recipes:
-        result.append(RecipeBaseResponse(
-            id=str(recipe.id),
-            title=recipe.title,
-            tags=recipe.tags,
-            cooking_time=recipe.cooking_time,
-            difficulty=recipe.difficulty,
-            calories_per_100g=recipe.calories_per_100g,
-            protein_per_100g=recipe.protein_per_100g,
-            fat_per_100g=recipe.fat_per_100g,
-            carbs_per_100g=recipe.carbs_per_100g,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            notes=recipe.notes,
-            created_at=recipe.created_at.isoformat() if recipe.created_at else ""
-        ))
-
-    return result
+    return [RecipeBaseResponse.from_recipe(recipe) for recipe in recipes]
 
 
 # --- Генерация рецептов ---
@@ -223,105 +436,58 @@ async def get_random_base_recipes(limit: int = 5):
 @router.post("/generate-recipe")
 async def generate_recipe(
     photo: UploadFile = File(...),
-    clarifications: str = Form(""),
-    target_calories: float = Form(...),
-    target_protein: float = Form(0),
-    target_fat: float = Form(0),
-    target_carbs: float = Form(0),
-    greens_weight: float = Form(0),
-    cooking_tags: str = Form("")
+    form: GenerateRecipeForm = Depends(GenerateRecipeForm.as_form),
 ):
     """Генерировать рецепт на основе фото"""
-    from bot.core.config import settings
+    settings = get_settings()
 
     # Проверка типа файла
-    if not photo.content_type or not photo.content_type.startswith('image/'):
+    if photo.content_type not in settings.allowed_image_types_set:
         raise HTTPException(
             status_code=400,
             detail="Файл должен быть изображением (JPEG, PNG, WebP)"
         )
 
     # Проверка расширения
-    file_extension = os.path.splitext(photo.filename)[1].lower()
-    allowed_extensions = ['.jpg', '.jpeg', '.png', '.webp']
-    if file_extension not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Неподдерживаемый формат. Разрешены: {', '.join(allowed_extensions)}"
-        )
+    image_extension(photo)
 
-    # Читаем файл
-    content = await photo.read()
-    file_size = len(content)
-
-    # Проверка размера
-    if file_size > settings.max_upload_size:
-        max_size_mb = settings.max_upload_size / 1024 / 1024
-        raise HTTPException(
-            status_code=400,
-            detail=f"Файл слишком большой. Максимальный размер: {max_size_mb:.1f} МБ"
-        )
+    # Читаем файл порциями с проверкой размера
+    content = await read_upload_limited(photo, settings.max_upload_size)
 
     # Валидация параметров
-    if not (0 < target_calories <= 10000):
-        raise HTTPException(
-            status_code=400,
-            detail="Калории должны быть от 0 до 10000"
-        )
-
-    # Опциональные параметры - проверяем только если указаны
-    if target_protein > 0 and not (0 < target_protein <= 1000):
-        raise HTTPException(
-            status_code=400,
-            detail="Белки должны быть от 0 до 1000 г"
-        )
-
-    if target_fat > 0 and not (0 < target_fat <= 1000):
-        raise HTTPException(
-            status_code=400,
-            detail="Жиры должны быть от 0 до 1000 г"
-        )
-
-    if target_carbs > 0 and not (0 < target_carbs <= 1000):
-        raise HTTPException(
-            status_code=400,
-            detail="Углеводы должны быть от 0 до 1000 г"
-        )
-
-    if greens_weight > 0 and not (0 < greens_weight <= 2000):
-        raise HTTPException(
-            status_code=400,
-            detail="Вес растительности должен быть от 0 до 2000 г"
-        )
+    form.check_bounds()
 
     try:
         # Формируем параметры для AI
         ai_params = {
             "image_data": content,  # Передаем изображение напрямую
-            "target_calories": int(target_calories)
+            # Без int(): дробные калории до 1 ккал не должны превращаться в 0
+            "target_calories": form.target_calories
         }
 
         # Добавляем уточнения пользователя, если есть
-        if clarifications:
-            ai_params["ingredients"] = [f"Уточнения: {clarifications}"]
+        if form.clarifications:
+            ai_params["ingredients"] = [f"Уточнения: {form.clarifications}"]
 
         # Добавляем опциональные параметры только если они указаны
-        if target_protein > 0:
-            ai_params["target_protein"] = target_protein
-        if target_fat > 0:
-            ai_params["target_fat"] = target_fat
-        if target_carbs > 0:
-            ai_params["target_carbs"] = target_carbs
-        if greens_weight > 0:
+        if form.target_protein > 0:
+            ai_params["target_protein"] = form.target_protein
+        if form.target_fat > 0:
+            ai_params["target_fat"] = form.target_fat
+        if form.target_carbs > 0:
+            ai_params["target_carbs"] = form.target_carbs
+        if form.greens_weight > 0:
             # Используем plant_level для нового промпта, но сохраняем greens_weight для БД
-            ai_params["plant_level"] = greens_weight
+            ai_params["plant_level"] = form.greens_weight
         
         # Добавляем теги способов приготовления, если указаны
-        if cooking_tags:
-            ai_params["cooking_tags"] = cooking_tags
+        if form.cooking_tags:
+            ai_params["cooking_tags"] = form.cooking_tags
 
         # Генерируем рецепт напрямую из изображения
-        recipe_data = await openai_service.generate_recipe(**ai_params)
+        recipe_data = await openai_service.generate_recipe(
+            **ai_params, bypass_cache=form.regenerate
+        )
 
         # Извлекаем список ингредиентов для сохранения в БД
         ingredients_list = []
@@ -333,14 +499,14 @@ async def generate_recipe(
         # Сохраняем рецепт в БД
         recipe = await Recipe.create(
             photo_file_id="",  # Не сохраняем фото в файловой системе
-            ingredients_detected=json.dumps(ingredients_list, ensure_ascii=False),
-            clarifications=clarifications,
-            target_calories=target_calories,
-            target_protein=target_protein,
-            target_fat=target_fat,
-            target_carbs=target_carbs,
-            greens_weight=greens_weight,
-            recipe_text=json.dumps(recipe_data, ensure_ascii=False),
+            ingredients_detected=orjson.dumps(ingredients_list).decode(),
+            clarifications=form.clarifications,
+            target_calories=form.target_calories,
+            target_protein=form.target_protein,
+            target_fat=form.target_fat,
+            target_carbs=form.target_carbs,
+            greens_weight=form.greens_weight,
+            recipe_text=orjson.dumps(recipe_data).decode(),
             calculated_calories=recipe_data['calculated_nutrition']['calories'],
             calculated_protein=recipe_data['calculated_nutrition']['protein_g'],
             calculated_fat=recipe_data['calculated_nutrition']['fat_g'],
@@ -352,6 +518,9 @@ async def generate_recipe(
             "recipe": recipe_data
         }
 
+    except ValueError as e:
+        # Невыполнимые параметры отсекаются до запроса к OpenAI
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка генерации рецепта: {str(e)}")
 
@@ -361,7 +530,7 @@ async def get_recipe(recipe_id: str):
     """Получить рецепт по ID"""
     try:
         recipe = await Recipe.get(id=recipe_id)
-        recipe_data = json.loads(recipe.recipe_text) if recipe.recipe_text else {}
+        recipe_data = orjson.loads(recipe.recipe_text) if recipe.recipe_text else {}
 
         return {
             "id": str(recipe.id),
@@ -379,6 +548,6 @@ async def get_recipe(recipe_id: str):
             "calculated_carbs": recipe.calculated_carbs,
             "created_at": recipe.created_at.isoformat() if recipe.created_at else ""
         }
-    except Recipe.DoesNotExist:
+    except DoesNotExist:
         raise HTTPException(status_code=404, detail="Рецепт не найден")
 
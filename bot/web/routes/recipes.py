@@ -3,19 +3,19 @@
 """
 
 import base64
-import json
 import logging
-import os
 import traceback
 from pathlib import Path
 from typing import Optional
 from urllib.parse import quote
 import uuid
 
-from fastapi import APIRouter, Request, Response, HTTPException, UploadFile, File, Form
+import orjson
+from fastapi import APIRouter, Depends, Request, HTTPException, UploadFile, File, Form
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from tortoise.exceptions import DoesNotExist
 
+from bot.core.config import get_settings
 from bot.core.models import Recipe, RecipeBase
 from bot.services.openai_service import openai_service
 from bot.services.recipe_search import (
@@ -24,9 +24,11 @@ from bot.services.recipe_search import (
     find_recipes_by_title,
     get_random_recipes
 )
+from bot.web.routes.api import GenerateRecipeForm
+from bot.web.templates import templates
+from bot.web.uploads import image_extension, read_upload_limited
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 logger = logging.getLogger(__name__)
 
 # Директория для загрузки изображений
@@ -50,7 +52,7 @@ def decode_cookie_value(encoded_value: str) -> str:
         # Декодируем из base64
         return base64.b64decode(encoded_value.encode('ascii')).decode('utf-8')
     except Exception as e:
-        logger.error(f"Ошибка декодирования cookie: {e}")
+        logger.error("Ошибка декодирования cookie: %s", e)
         return ""
 
 
@@ -58,8 +60,7 @@ def encode_cookie_json(obj: dict) -> str:
     """Кодирует JSON объект в base64 для cookie"""
     if not obj:
         return ""
-    json_str = json.dumps(obj, ensure_ascii=False)
-    return base64.b64encode(json_str.encode('utf-8')).decode('ascii')
+    return base64.b64encode(orjson.dumps(obj)).decode('ascii')
 
 
 def decode_cookie_json(encoded_value: str) -> dict:
@@ -67,10 +68,9 @@ def decode_cookie_json(encoded_value: str) -> dict:
     if not encoded_value:
         return {}
     try:
-        json_str = base64.b64decode(encoded_value.encode('ascii')).decode('utf-8')
-        return json.loads(json_str)
+        return orjson.loads(base64.b64decode(encoded_value.encode('ascii')))
     except Exception as e:
-        logger.error(f"Ошибка декодирования JSON cookie: {e}")
+        logger.error("Ошибка декодирования JSON cookie: %s", e)
         return {}
 
 
@@ -78,20 +78,22 @@ def decode_cookie_json(encoded_value: str) -> dict:
 async def recipes_home(request: Request):
     """Главная страница рецептов"""
     # Получаем последние рецепты
-    recipes = await Recipe.all().order_by("-created_at").limit(10)
-    
-    # Парсим recipe_text для каждого рецепта и добавляем как атрибут
+    # Краткие данные для карточек; recipe_text нужен для названия
+    recipes = await Recipe.summaries("recipe_text", limit=10)
+
+    # Парсим recipe_text для каждого рецепта
     for recipe in recipes:
-        if recipe.recipe_text:
+        recipe_text = recipe.pop("recipe_text")
+        if recipe_text:
             try:
-                if isinstance(recipe.recipe_text, str):
-                    recipe.recipe_data = json.loads(recipe.recipe_text)
+                if isinstance(recipe_text, str):
+                    recipe["recipe_data"] = orjson.loads(recipe_text)
                 else:
-                    recipe.recipe_data = recipe.recipe_text
-            except (json.JSONDecodeError, TypeError):
-                recipe.recipe_data = {}
+                    recipe["recipe_data"] = recipe_text
+            except (orjson.JSONDecodeError, TypeError):
+                recipe["recipe_data"] = {}
         else:
-            recipe.recipe_data = {}
+            recipe["recipe_data"] = {}
 
     context = {
         "request": request,
@@ -127,41 +129,25 @@ async def process_photo_upload(
     photo: UploadFile = File(...)
 ):
     """Обработка загруженного фото - шаг 1"""
-    from bot.core.config import settings
+    settings = get_settings()
 
     # Проверка типа файла
-    if not photo.content_type or not photo.content_type.startswith('image/'):
+    if photo.content_type not in settings.allowed_image_types_set:
         raise HTTPException(
             status_code=400,
             detail="Файл должен быть изображением (JPEG, PNG, WebP)"
         )
 
     # Проверка расширения
-    file_extension = os.path.splitext(photo.filename)[1].lower()
-    allowed_extensions = ['.jpg', '.jpeg', '.png', '.webp']
-    if file_extension not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Неподдерживаемый формат. Разрешены: {', '.join(allowed_extensions)}"
-        )
+    file_extension = image_extension(photo)
 
-    # Читаем файл один раз для проверки размера и сохранения
-    content = await photo.read()
-    file_size = len(content)
-
-    # Проверка размера
-    if file_size > settings.max_upload_size:
-        max_size_mb = settings.max_upload_size / 1024 / 1024
-        raise HTTPException(
-            status_code=400,
-            detail=f"Файл слишком большой. Максимальный размер: {max_size_mb:.1f} МБ"
-        )
+    # Читаем файл порциями с проверкой размера
+    content = await read_upload_limited(photo, settings.max_upload_size)
 
     # Генерируем уникальный ID сессии
     session_id = str(uuid.uuid4())
 
     # Сохраняем фото
-    file_extension = os.path.splitext(photo.filename)[1]
     file_name = f"{session_id}_recipe{file_extension}"
     file_path = UPLOAD_DIR / file_name
 
@@ -289,45 +275,17 @@ async def nutrition_parameters_page(request: Request):
 @router.post("/create/step3")
 async def process_nutrition_parameters(
     request: Request,
-    target_calories: float = Form(...),
-    target_protein: float = Form(0),
-    target_fat: float = Form(0),
-    target_carbs: float = Form(0),
-    greens_weight: float = Form(0),
-    cooking_tags: str = Form("")
+    form: GenerateRecipeForm = Depends(GenerateRecipeForm.as_form),
 ):
     """Обработка параметров КБЖУ и генерация рецепта"""
-    # Валидация диапазонов
-    if not (0 < target_calories <= 10000):
-        raise HTTPException(
-            status_code=400,
-            detail="Калории должны быть от 0 до 10000"
-        )
-
-    # Опциональные параметры - проверяем только если указаны
-    if target_protein > 0 and not (0 < target_protein <= 1000):
-        raise HTTPException(
-            status_code=400,
-            detail="Белки должны быть от 0 до 1000 г"
-        )
-
-    if target_fat > 0 and not (0 < target_fat <= 1000):
-        raise HTTPException(
-            status_code=400,
-            detail="Жиры должны быть от 0 до 1000 г"
-        )
-
-    if target_carbs > 0 and not (0 < target_carbs <= 1000):
-        raise HTTPException(
-            status_code=400,
-            detail="Углеводы должны быть от 0 до 1000 г"
-        )
-
-    if greens_weight > 0 and not (0 < greens_weight <= 2000):
-        raise HTTPException(
-            status_code=400,
-            detail="Вес растительности должен быть от 0 до 2000 г"
-        )
+    # Валидация диапазонов (уточнения на этом шаге берутся из cookie, а не из формы)
+    form.check_bounds()
+    target_calories = form.target_calories
+    target_protein = form.target_protein
+    target_fat = form.target_fat
+    target_carbs = form.target_carbs
+    greens_weight = form.greens_weight
+    cooking_tags = form.cooking_tags
 
     # Получаем данные из сессии
     photo_path = request.cookies.get("recipe_photo")
@@ -343,7 +301,8 @@ async def process_nutrition_parameters(
 
     # Формируем параметры для AI
     ai_params = {
-        "target_calories": int(target_calories)
+        # Без int(): дробные калории до 1 ккал не должны превращаться в 0
+        "target_calories": target_calories
     }
 
     # Пытаемся прочитать изображение, если оно доступно
@@ -352,7 +311,7 @@ async def process_nutrition_parameters(
         try:
             # Путь в cookie сохранен относительно "static", поэтому используем Path("static") / photo_path
             photo_full_path = Path("static") / photo_path
-            logger.info(f"Попытка прочитать изображение из: {photo_full_path}")
+            logger.info("Попытка прочитать изображение из: %s", photo_full_path)
             if photo_full_path.exists():
                 try:
                     import aiofiles
@@ -362,12 +321,14 @@ async def process_nutrition_parameters(
                     # Fallback на синхронное чтение если aiofiles не установлен
                     with open(photo_full_path, 'rb') as f:
                         image_data = f.read()
-                logger.info(f"Изображение прочитано успешно, размер: {len(image_data)} байт")
+                logger.info(
+                    "Изображение прочитано успешно, размер: %d байт", len(image_data)
+                )
                 ai_params["image_data"] = image_data
             else:
-                logger.error(f"Файл изображения не найден: {photo_full_path}")
+                logger.error("Файл изображения не найден: %s", photo_full_path)
         except Exception as e:
-            logger.error(f"Не удалось прочитать изображение: {e}", exc_info=True)
+            logger.error("Не удалось прочитать изображение: %s", e, exc_info=True)
 
     # Если изображения нет, используем список ингредиентов из анализа (обратная совместимость)
     if not image_data:
@@ -399,21 +360,31 @@ async def process_nutrition_parameters(
 
     try:
         # Генерируем рецепт
-        recipe_data = await openai_service.generate_recipe(**ai_params)
+        recipe_data = await openai_service.generate_recipe(
+            **ai_params, bypass_cache=form.regenerate
+        )
 
         # Валидация структуры данных рецепта
         if not recipe_data:
             raise ValueError("Не получены данные рецепта от OpenAI")
         
         if 'calculated_nutrition' not in recipe_data:
-            logger.error(f"Отсутствует ключ 'calculated_nutrition' в recipe_data. Доступные ключи: {recipe_data.keys()}")
+            logger.error(
+                "Отсутствует ключ 'calculated_nutrition' в recipe_data. "
+                "Доступные ключи: %s",
+                recipe_data.keys(),
+            )
             raise ValueError("Неверная структура данных рецепта: отсутствует 'calculated_nutrition'")
         
         nutrition = recipe_data['calculated_nutrition']
         required_nutrition_fields = ['calories', 'protein_g', 'fat_g', 'carbs_g']
         for field in required_nutrition_fields:
             if field not in nutrition:
-                logger.error(f"Отсутствует поле '{field}' в calculated_nutrition. Доступные поля: {nutrition.keys()}")
+                logger.error(
+                    "Отсутствует поле '%s' в calculated_nutrition. Доступные поля: %s",
+                    field,
+                    nutrition.keys(),
+                )
                 raise ValueError(f"Неверная структура данных рецепта: отсутствует '{field}' в calculated_nutrition")
 
         # Извлекаем список ингредиентов для сохранения в БД
@@ -436,14 +407,14 @@ async def process_nutrition_parameters(
 
         recipe = await Recipe.create(
             photo_file_id=photo_path,  # Сохраняем путь к фото
-            ingredients_detected=json.dumps(ingredients_list, ensure_ascii=False),
+            ingredients_detected=orjson.dumps(ingredients_list).decode(),
             clarifications=clarifications_combined,
             target_calories=target_calories,
             target_protein=target_protein if target_protein > 0 else 0,
             target_fat=target_fat if target_fat > 0 else 0,
             target_carbs=target_carbs if target_carbs > 0 else 0,
             greens_weight=greens_weight if greens_weight > 0 else 0,
-            recipe_text=json.dumps(recipe_data, ensure_ascii=False),
+            recipe_text=orjson.dumps(recipe_data).decode(),
             calculated_calories=float(nutrition['calories']),
             calculated_protein=float(nutrition['protein_g']),
             calculated_fat=float(nutrition['fat_g']),
@@ -464,7 +435,7 @@ async def process_nutrition_parameters(
     except Exception as e:
         # Логируем ошибку
         error_msg = str(e)
-        logger.error(f"Ошибка при создании рецепта: {error_msg}")
+        logger.error("Ошибка при создании рецепта: %s", error_msg)
         logger.error(traceback.format_exc())
 
         # В случае ошибки очищаем сессию и показываем сообщение об ошибке
@@ -493,9 +464,9 @@ async def view_recipe(request: Request, recipe_id: str):
         # Парсим recipe_text если это строка
         if isinstance(recipe.recipe_text, str):
             try:
-                recipe_data = json.loads(recipe.recipe_text)
-            except (json.JSONDecodeError, TypeError):
-                logger.error(f"Failed to parse recipe_text for recipe {recipe_id}")
+                recipe_data = orjson.loads(recipe.recipe_text)
+            except (orjson.JSONDecodeError, TypeError):
+                logger.error("Failed to parse recipe_text for recipe %s", recipe_id)
                 recipe_data = {}
         elif isinstance(recipe.recipe_text, dict):
             recipe_data = recipe.recipe_text
@@ -510,7 +481,7 @@ async def view_recipe(request: Request, recipe_id: str):
         }
 
         return templates.TemplateResponse("recipes/view.html", context)
-    except Recipe.DoesNotExist:
+    except DoesNotExist:
         raise HTTPException(status_code=404, detail="Рецепт не найден")
 
 
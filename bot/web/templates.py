@@ -0,0 +1,28 @@
+"""
+Общие Jinja2 шаблоны веб-приложения
+"""
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from bot.core.config import get_settings
+
+TEMPLATES_DIR = "templates"
+
+
+def _create_templates() -> Jinja2Templates:
+    """Одно окружение Jinja2 на все роуты: шаблон компилируется один раз"""
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        # В продакшене не проверяем mtime файлов шаблонов на каждый рендер
+        auto_reload=get_settings().debug,
+        # Байткод переживает перезапуск процесса. Каталог по умолчанию Jinja
+        # создает для текущего пользователя с правами 0700 и проверяет владельца
+        bytecode_cache=FileSystemBytecodeCache(),
+        cache_size=400,
+    )
+    return Jinja2Templates(env=env)
+
+
+templates = _create_templates()
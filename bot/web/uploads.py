@@ -0,0 +1,59 @@
+"""
+Проверка и чтение загружаемых фото
+"""
+
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile, status
+
+# Размер порции чтения из SpooledTemporaryFile
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Допустимые расширения фото (порядок - для текста ошибки)
+ALLOWED_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+_ALLOWED_IMAGE_EXTENSIONS_SET = frozenset(ALLOWED_IMAGE_EXTENSIONS)
+_UNSUPPORTED_FORMAT_DETAIL = (
+    f"Неподдерживаемый формат. Разрешены: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
+)
+
+
+def image_extension(upload: UploadFile) -> str:
+    """
+    Расширение загруженного фото в нижнем регистре
+
+    Raises:
+        HTTPException: 400, если расширение не из ALLOWED_IMAGE_EXTENSIONS
+    """
+    extension = Path(upload.filename or "").suffix.lower()
+    if extension not in _ALLOWED_IMAGE_EXTENSIONS_SET:
+        raise HTTPException(status_code=400, detail=_UNSUPPORTED_FORMAT_DETAIL)
+    return extension
+
+
+def _too_large(max_size: int) -> HTTPException:
+    max_size_mb = max_size / 1024 / 1024
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Файл слишком большой. Максимальный размер: {max_size_mb:.1f} МБ"
+    )
+
+
+async def read_upload_limited(upload: UploadFile, max_size: int) -> bytes:
+    """
+    Прочитать файл порциями, прерываясь сразу после превышения max_size
+
+    Слишком большой файл не копируется в память целиком.
+
+    Raises:
+        HTTPException: 413, если файл больше max_size
+    """
+    # Размер известен заранее, если клиент передал его в multipart
+    if upload.size is not None and upload.size > max_size:
+        raise _too_large(max_size)
+
+    buffer = bytearray()
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > max_size:
+            raise _too_large(max_size)
+    return bytes(buffer)
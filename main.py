@@ -3,28 +3,41 @@ AI Recipe Web App - FastAPI приложение
 """
 
 import asyncio
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import sys
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request, Response, Depends, HTTPException, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from tortoise import Tortoise
+from fastapi.responses import HTMLResponse, ORJSONResponse
 
-from bot.core.config import settings
+from bot.core.config import get_settings
 from bot.core.models import init_db, close_db
+from bot.services.openai_service import openai_service
 from bot.web.routes import recipes, main, api
+from bot.web.templates import templates
+
+settings = get_settings()
+
+# Настройка логирования: обработчики пишут в очередь, а вывод в stdout
+# делает отдельный поток QueueListener, чтобы запись не блокировала event loop
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, logging.StreamHandler(sys.stdout)
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
-# Настройка логирования
 logging.basicConfig(
     level=logging.INFO if settings.debug else logging.WARNING,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=sys.stdout,
+    handlers=[logging.handlers.QueueHandler(_log_queue)],
 )
 
 logger = logging.getLogger(__name__)
@@ -42,27 +55,29 @@ async def lifespan(app: FastAPI):
     # Инициализация
     logger.info("=" * 50)
     logger.info("Запуск веб-приложения...")
-    logger.info(f"Host: {settings.host}, Port: {settings.port}")
-    logger.info(f"Database URL: {settings.database_url[:50]}...")  # Показываем только начало для безопасности
+    logger.info("Host: %s, Port: %s", settings.host, settings.port)
+    # Показываем только начало для безопасности
+    logger.info("Database URL: %s...", settings.database_url[:50])
     logger.info("=" * 50)
     
     try:
         logger.info("Инициализация базы данных...")
-        await init_db(settings.database_url)
+        await init_db(settings.database_url, create_schema=settings.generate_schemas)
         logger.info("✅ База данных инициализирована успешно")
     except Exception as e:
         logger.error("❌ Ошибка инициализации базы данных", exc_info=True)
-        logger.error(f"Детали ошибки: {str(e)}")
+        logger.error("Детали ошибки: %s", e)
         raise
 
     yield
 
     # Завершение
     try:
+        await openai_service.aclose()
         await close_db()
         logger.info("Веб-приложение остановлено")
     except Exception as e:
-        logger.error(f"Ошибка при закрытии базы данных: {e}", exc_info=True)
+        logger.error("Ошибка при закрытии базы данных: %s", e, exc_info=True)
 
 
 # Инициализация FastAPI
@@ -71,6 +86,8 @@ app = FastAPI(
     description="Веб-приложение для создания рецептов с помощью ИИ",
     version="1.0.0",
     lifespan=lifespan,
+    # JSON ответы API сериализуются orjson
+    default_response_class=ORJSONResponse,
 )
 
 # Middleware для правильной обработки кодировки UTF-8
@@ -102,8 +119,8 @@ async def utf8_middleware(request, call_next):
     return response
 
 # Настройка CORS
-if settings.cors_origins.strip():
-    origins = [origin.strip() for origin in settings.cors_origins.split(",") if origin.strip()]
+if settings.cors_origin_list:
+    origins = list(settings.cors_origin_list)
 else:
     # Для разработки разрешаем localhost
     origins = ["http://localhost:8000", "http://127.0.0.1:8000"] if settings.debug else []
@@ -119,9 +136,6 @@ app.add_middleware(
 # Монтируем статические файлы
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Настройка шаблонов
-templates = Jinja2Templates(directory="templates")
-
 # Подключаем роутеры
 app.include_router(main.router, tags=["main"])
 app.include_router(recipes.router, prefix="/recipes", tags=["recipes"])
@@ -177,7 +191,7 @@ async def app_status():
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Обработчик HTTP исключений"""
-    logger.warning(f"HTTP исключение: {exc.status_code} - {exc.detail}")
+    logger.warning("HTTP исключение: %s - %s", exc.status_code, exc.detail)
     
     # Для 404 ошибок показываем специальную страницу
     if exc.status_code == 404:
@@ -206,7 +220,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Глобальный обработчик исключений"""
-    logger.error(f"Необработанное исключение: {exc}", exc_info=True)
+    logger.error("Необработанное исключение: %s", exc, exc_info=True)
     
     # Определяем тип ошибки для более понятного сообщения
     error_message = str(exc)
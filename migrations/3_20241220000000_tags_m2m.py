@@ -0,0 +1,90 @@
+"""
+Move recipe_base.tags (comma separated text) into tags + recipe_base_tag
+"""
+import uuid
+
+from tortoise import BaseDBAsyncClient
+
+
+def _placeholders(db: BaseDBAsyncClient, count: int) -> str:
+    """Плейсхолдеры параметров в стиле драйвера: $1, $2 (asyncpg) или ? (SQLite)"""
+    if db.capabilities.dialect == "postgres":
+        return ", ".join(f"${i}" for i in range(1, count + 1))
+    return ", ".join("?" * count)
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    await db.execute_script("""
+        CREATE TABLE IF NOT EXISTS "tags" (
+            "id" CHAR(36) NOT NULL PRIMARY KEY,
+            "name" VARCHAR(64) NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS "recipe_base_tag" (
+            "recipe_base_id" CHAR(36) NOT NULL
+                REFERENCES "recipe_base" ("id") ON DELETE CASCADE,
+            "tag_id" CHAR(36) NOT NULL REFERENCES "tags" ("id") ON DELETE CASCADE
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS "uidx_recipe_base_tag"
+            ON "recipe_base_tag" ("recipe_base_id", "tag_id");
+        -- Поиск рецептов по тегу идёт от tag_id
+        CREATE INDEX IF NOT EXISTS "idx_recipe_base_tag_tag_id"
+            ON "recipe_base_tag" ("tag_id");
+    """)
+
+    # Разбиваем строку тегов через запятую в Python: LOWER в SQLite
+    # не переводит кириллицу в нижний регистр
+    _, rows = await db.execute_query(
+        'SELECT "id", "tags" FROM "recipe_base" '
+        'WHERE "tags" IS NOT NULL AND "tags" != \'\''
+    )
+    _, existing = await db.execute_query('SELECT "id", "name" FROM "tags"')
+    tag_ids = {row["name"]: row["id"] for row in existing}
+    new_tags = []
+    links = []
+    for row in rows:
+        names = dict.fromkeys(
+            t.strip().lower()[:64] for t in row["tags"].split(",") if t.strip()
+        )
+        for name in names:
+            if name not in tag_ids:
+                tag_ids[name] = str(uuid.uuid4())
+                new_tags.append([tag_ids[name], name])
+            links.append([row["id"], tag_ids[name]])
+
+    # ON CONFLICT DO NOTHING есть и в PostgreSQL, и в SQLite (3.24+)
+    if new_tags:
+        await db.execute_many(
+            f'INSERT INTO "tags" ("id", "name") VALUES ({_placeholders(db, 2)}) '
+            'ON CONFLICT DO NOTHING',
+            new_tags,
+        )
+    if links:
+        await db.execute_many(
+            'INSERT INTO "recipe_base_tag" ("recipe_base_id", "tag_id") '
+            f'VALUES ({_placeholders(db, 2)}) '
+            'ON CONFLICT DO NOTHING',
+            links,
+        )
+
+    return """
+        ALTER TABLE "recipe_base" DROP COLUMN "tags";
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    # Склейка строк: string_agg в PostgreSQL, GROUP_CONCAT в SQLite
+    if db.capabilities.dialect == "postgres":
+        joined_names = """string_agg(t."name", ',' ORDER BY t."name")"""
+    else:
+        joined_names = """GROUP_CONCAT(t."name", ',')"""
+    return f"""
+        ALTER TABLE "recipe_base" ADD COLUMN "tags" TEXT;
+        UPDATE "recipe_base" SET "tags" = (
+            SELECT {joined_names}
+            FROM "recipe_base_tag" rt
+            JOIN "tags" t ON t."id" = rt."tag_id"
+            WHERE rt."recipe_base_id" = "recipe_base"."id"
+        );
+        DROP TABLE IF EXISTS "recipe_base_tag";
+        DROP TABLE IF EXISTS "tags";
+    """
@@ -0,0 +1,68 @@
+"""
+Store recipe_base KBZHU per 100 g as SMALLINT tenths instead of REAL
+"""
+from tortoise import BaseDBAsyncClient
+
+
+def _to_tenths_sql(db: BaseDBAsyncClient, column: str) -> str:
+    """
+    Граммы -> десятые доли с округлением половины вверх, как _to_tenths в models
+
+    ROUND в SQL округляет половину от нуля, а round() в Python - к четному,
+    поэтому обе стороны используют floor(x * 10 + 0.5). Значения неотрицательные,
+    так что в SQLite (FLOOR есть не во всех сборках) хватает CAST AS INTEGER.
+    """
+    if db.capabilities.dialect == "postgres":
+        # REAL в PostgreSQL - float4; считаем в double, как Python
+        return (
+            f'CAST(FLOOR(CAST("{column}" AS DOUBLE PRECISION) * 10 + 0.5) AS INTEGER)'
+        )
+    return f'CAST("{column}" * 10 + 0.5 AS INTEGER)'
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return f"""
+        ALTER TABLE "recipe_base"
+            ADD COLUMN "calories_per_100g_x10" SMALLINT NOT NULL DEFAULT 0;
+        ALTER TABLE "recipe_base"
+            ADD COLUMN "protein_per_100g_x10" SMALLINT NOT NULL DEFAULT 0;
+        ALTER TABLE "recipe_base"
+            ADD COLUMN "fat_per_100g_x10" SMALLINT NOT NULL DEFAULT 0;
+        ALTER TABLE "recipe_base"
+            ADD COLUMN "carbs_per_100g_x10" SMALLINT NOT NULL DEFAULT 0;
+
+        UPDATE "recipe_base" SET
+            "calories_per_100g_x10" = {_to_tenths_sql(db, "calories_per_100g")},
+            "protein_per_100g_x10" = {_to_tenths_sql(db, "protein_per_100g")},
+            "fat_per_100g_x10" = {_to_tenths_sql(db, "fat_per_100g")},
+            "carbs_per_100g_x10" = {_to_tenths_sql(db, "carbs_per_100g")};
+
+        ALTER TABLE "recipe_base" DROP COLUMN "calories_per_100g";
+        ALTER TABLE "recipe_base" DROP COLUMN "protein_per_100g";
+        ALTER TABLE "recipe_base" DROP COLUMN "fat_per_100g";
+        ALTER TABLE "recipe_base" DROP COLUMN "carbs_per_100g";
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "recipe_base"
+            ADD COLUMN "calories_per_100g" REAL NOT NULL DEFAULT 0;
+        ALTER TABLE "recipe_base"
+            ADD COLUMN "protein_per_100g" REAL NOT NULL DEFAULT 0;
+        ALTER TABLE "recipe_base"
+            ADD COLUMN "fat_per_100g" REAL NOT NULL DEFAULT 0;
+        ALTER TABLE "recipe_base"
+            ADD COLUMN "carbs_per_100g" REAL NOT NULL DEFAULT 0;
+
+        UPDATE "recipe_base" SET
+            "calories_per_100g" = "calories_per_100g_x10" / 10.0,
+            "protein_per_100g" = "protein_per_100g_x10" / 10.0,
+            "fat_per_100g" = "fat_per_100g_x10" / 10.0,
+            "carbs_per_100g" = "carbs_per_100g_x10" / 10.0;
+
+        ALTER TABLE "recipe_base" DROP COLUMN "calories_per_100g_x10";
+        ALTER TABLE "recipe_base" DROP COLUMN "protein_per_100g_x10";
+        ALTER TABLE "recipe_base" DROP COLUMN "fat_per_100g_x10";
+        ALTER TABLE "recipe_base" DROP COLUMN "carbs_per_100g_x10";
+    """
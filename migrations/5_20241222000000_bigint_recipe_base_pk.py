@@ -0,0 +1,156 @@
+"""
+Switch recipe_base and tags primary keys from UUID to BIGINT autoincrement
+"""
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return _POSTGRES_UPGRADE
+    return _SQLITE_UPGRADE
+
+
+# SQLite не меняет тип PK на месте: пересоздаем таблицы
+_SQLITE_UPGRADE = """
+        -- Новые таблицы; old_id хранит прежний UUID для переноса связей
+        CREATE TABLE "tags_new" (
+            "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            "name" VARCHAR(64) NOT NULL UNIQUE,
+            "old_id" CHAR(36)
+        );
+        INSERT INTO "tags_new" ("name", "old_id")
+        SELECT "name", "id" FROM "tags" ORDER BY "name";
+
+        CREATE TABLE "recipe_base_new" (
+            "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            "title" VARCHAR(500) NOT NULL,
+            "cooking_time" VARCHAR(100),
+            "difficulty" VARCHAR(50),
+            "calories_per_100g_x10" SMALLINT NOT NULL,
+            "protein_per_100g_x10" SMALLINT NOT NULL,
+            "fat_per_100g_x10" SMALLINT NOT NULL,
+            "carbs_per_100g_x10" SMALLINT NOT NULL,
+            "ingredients" TEXT NOT NULL,
+            "instructions" TEXT NOT NULL,
+            "notes" TEXT,
+            "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "old_id" CHAR(36)
+        );
+        INSERT INTO "recipe_base_new" (
+            "title", "cooking_time", "difficulty",
+            "calories_per_100g_x10", "protein_per_100g_x10",
+            "fat_per_100g_x10", "carbs_per_100g_x10",
+            "ingredients", "instructions", "notes", "created_at", "old_id"
+        )
+        SELECT
+            "title", "cooking_time", "difficulty",
+            "calories_per_100g_x10", "protein_per_100g_x10",
+            "fat_per_100g_x10", "carbs_per_100g_x10",
+            "ingredients", "instructions", "notes", "created_at", "id"
+        FROM "recipe_base" ORDER BY "created_at";
+
+        CREATE TABLE "recipe_base_tag_new" (
+            "recipe_base_id" BIGINT NOT NULL
+                REFERENCES "recipe_base_new" ("id") ON DELETE CASCADE,
+            "tag_id" BIGINT NOT NULL REFERENCES "tags_new" ("id") ON DELETE CASCADE
+        );
+        INSERT INTO "recipe_base_tag_new" ("recipe_base_id", "tag_id")
+        SELECT r."id", t."id"
+        FROM "recipe_base_tag" rt
+        JOIN "recipe_base_new" r ON r."old_id" = rt."recipe_base_id"
+        JOIN "tags_new" t ON t."old_id" = rt."tag_id";
+
+        -- Меняем таблицы местами (ссылки recipe_base_tag переименовываются
+        -- вместе с ними)
+        DROP TABLE "recipe_base_tag";
+        DROP TABLE "recipe_base";
+        DROP TABLE "tags";
+        ALTER TABLE "tags_new" RENAME TO "tags";
+        ALTER TABLE "recipe_base_new" RENAME TO "recipe_base";
+        ALTER TABLE "recipe_base_tag_new" RENAME TO "recipe_base_tag";
+        ALTER TABLE "tags" DROP COLUMN "old_id";
+        ALTER TABLE "recipe_base" DROP COLUMN "old_id";
+
+        CREATE INDEX IF NOT EXISTS "idx_recipe_base_created_6d2d"
+            ON "recipe_base" ("created_at");
+        CREATE UNIQUE INDEX IF NOT EXISTS "uidx_recipe_base_tag"
+            ON "recipe_base_tag" ("recipe_base_id", "tag_id");
+        CREATE INDEX IF NOT EXISTS "idx_recipe_base_tag_tag_id"
+            ON "recipe_base_tag" ("tag_id");
+    """
+
+# PostgreSQL: UUID-строки нельзя привести к BIGINT через ALTER COLUMN ... TYPE
+# (в USING нельзя подзапрос), поэтому новые id кладем рядом, переносим связи
+# по старым id и меняем колонки местами. Последовательности - как у BIGSERIAL
+_POSTGRES_UPGRADE = """
+        ALTER TABLE "recipe_base_tag"
+            DROP CONSTRAINT IF EXISTS "recipe_base_tag_recipe_base_id_fkey";
+        ALTER TABLE "recipe_base_tag"
+            DROP CONSTRAINT IF EXISTS "recipe_base_tag_tag_id_fkey";
+
+        -- Новые id в порядке создания рецептов и по алфавиту тегов
+        ALTER TABLE "recipe_base" ADD COLUMN "new_id" BIGINT;
+        UPDATE "recipe_base" r SET "new_id" = n."rn"
+        FROM (
+            SELECT "id", ROW_NUMBER() OVER (ORDER BY "created_at", "id") AS "rn"
+            FROM "recipe_base"
+        ) n
+        WHERE r."id" = n."id";
+
+        ALTER TABLE "tags" ADD COLUMN "new_id" BIGINT;
+        UPDATE "tags" t SET "new_id" = n."rn"
+        FROM (SELECT "id", ROW_NUMBER() OVER (ORDER BY "name") AS "rn" FROM "tags") n
+        WHERE t."id" = n."id";
+
+        ALTER TABLE "recipe_base_tag" ADD COLUMN "new_recipe_base_id" BIGINT;
+        ALTER TABLE "recipe_base_tag" ADD COLUMN "new_tag_id" BIGINT;
+        UPDATE "recipe_base_tag" rt SET "new_recipe_base_id" = r."new_id"
+        FROM "recipe_base" r WHERE r."id" = rt."recipe_base_id";
+        UPDATE "recipe_base_tag" rt SET "new_tag_id" = t."new_id"
+        FROM "tags" t WHERE t."id" = rt."tag_id";
+
+        -- Индексы по старым колонкам удаляются вместе с ними
+        ALTER TABLE "recipe_base_tag" DROP COLUMN "recipe_base_id";
+        ALTER TABLE "recipe_base_tag" DROP COLUMN "tag_id";
+        ALTER TABLE "recipe_base_tag"
+            RENAME COLUMN "new_recipe_base_id" TO "recipe_base_id";
+        ALTER TABLE "recipe_base_tag" RENAME COLUMN "new_tag_id" TO "tag_id";
+        ALTER TABLE "recipe_base_tag" ALTER COLUMN "recipe_base_id" SET NOT NULL;
+        ALTER TABLE "recipe_base_tag" ALTER COLUMN "tag_id" SET NOT NULL;
+
+        ALTER TABLE "recipe_base" DROP COLUMN "id";
+        ALTER TABLE "recipe_base" RENAME COLUMN "new_id" TO "id";
+        ALTER TABLE "recipe_base" ADD PRIMARY KEY ("id");
+        CREATE SEQUENCE "recipe_base_id_seq" OWNED BY "recipe_base"."id";
+        SELECT setval('"recipe_base_id_seq"', COALESCE(MAX("id"), 0) + 1, false)
+        FROM "recipe_base";
+        ALTER TABLE "recipe_base"
+            ALTER COLUMN "id" SET DEFAULT nextval('"recipe_base_id_seq"');
+
+        ALTER TABLE "tags" DROP COLUMN "id";
+        ALTER TABLE "tags" RENAME COLUMN "new_id" TO "id";
+        ALTER TABLE "tags" ADD PRIMARY KEY ("id");
+        CREATE SEQUENCE "tags_id_seq" OWNED BY "tags"."id";
+        SELECT setval('"tags_id_seq"', COALESCE(MAX("id"), 0) + 1, false) FROM "tags";
+        ALTER TABLE "tags" ALTER COLUMN "id" SET DEFAULT nextval('"tags_id_seq"');
+
+        ALTER TABLE "recipe_base_tag"
+            ADD CONSTRAINT "recipe_base_tag_recipe_base_id_fkey"
+            FOREIGN KEY ("recipe_base_id") REFERENCES "recipe_base" ("id")
+            ON DELETE CASCADE;
+        ALTER TABLE "recipe_base_tag" ADD CONSTRAINT "recipe_base_tag_tag_id_fkey"
+            FOREIGN KEY ("tag_id") REFERENCES "tags" ("id") ON DELETE CASCADE;
+        CREATE UNIQUE INDEX IF NOT EXISTS "uidx_recipe_base_tag"
+            ON "recipe_base_tag" ("recipe_base_id", "tag_id");
+        CREATE INDEX IF NOT EXISTS "idx_recipe_base_tag_tag_id"
+            ON "recipe_base_tag" ("tag_id");
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    # Прежние UUID не сохранены: новые ключи уже разошлись по ссылкам
+    # /api/v1/recipes-base/{id}, а выдуманные UUID их не восстановят
+    raise RuntimeError(
+        "Миграция 5 необратима: исходные UUID рецептов и тегов не сохранены. "
+        "Для отката восстановите базу из резервной копии"
+    )
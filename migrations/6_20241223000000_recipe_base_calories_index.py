@@ -0,0 +1,17 @@
+"""
+Index recipe_base.calories_per_100g_x10 for KBZHU search
+"""
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_recipe_base_calorie_2c48"
+            ON "recipe_base" ("calories_per_100g_x10");
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_recipe_base_calorie_2c48";
+    """
@@ -0,0 +1,37 @@
+"""
+Trigram index on recipe_base.title for substring search (PostgreSQL only)
+"""
+import logging
+
+from tortoise import BaseDBAsyncClient
+
+logger = logging.getLogger(__name__)
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # В SQLite LIKE '%...%' индексом не ускоряется
+    if db.capabilities.dialect != "postgres":
+        return ""
+    # Без пакета contrib расширения нет: поиск работает и без индекса,
+    # а упавшая миграция остановила бы все следующие
+    _, rows = await db.execute_query(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )
+    if not rows:
+        logger.warning("Расширение pg_trgm недоступно, trigram-индекс не создан")
+        return ""
+    # Выражение совпадает с фильтром title__icontains в Tortoise
+    return """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS "idx_recipe_base_title_trgm"
+            ON "recipe_base" USING gin ((UPPER(CAST("title" AS VARCHAR))) gin_trgm_ops);
+    """
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect != "postgres":
+        return ""
+    # Расширение pg_trgm оставляем: им могут пользоваться другие объекты базы
+    return """
+        DROP INDEX IF EXISTS "idx_recipe_base_title_trgm";
+    """
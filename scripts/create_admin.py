@@ -8,13 +8,13 @@ import asyncio
 import os
 from bot.core.models import User, init_db, close_db
 from bot.web.dependencies import get_password_hash
-from bot.core.config import settings
+from bot.core.config import get_settings
 
 
 async def create_initial_admin():
     """Создает начального администратора если его нет"""
 
-    await init_db(settings.database_url)
+    await init_db(get_settings().database_url)
 
     try:
         # Проверяем, есть ли уже админы
@@ -6,28 +6,17 @@ import sys
 from pathlib import Path
 from typing import List, Dict
 
-from tortoise import Tortoise
-
-from bot.core.config import settings
-from bot.core.models import RecipeBase
+from bot.core.config import get_settings
+from bot.core.models import RecipeBase, close_db, init_db as init_models_db
 from bot.services.pdf_processor import PDFRecipeProcessor
 
 
 async def init_db():
     """Инициализация базы данных"""
-    await Tortoise.init(
-        db_url=settings.database_url,
-        modules={'models': ['models']}
-    )
-    await Tortoise.generate_schemas()
+    await init_models_db(get_settings().database_url)
     print("✅ База данных инициализирована\n")
 
 
-async def close_db():
-    """Закрытие соединения с базой данных"""
-    await Tortoise.close_connections()
-
-
 async def save_recipes_to_db(recipes: List[Dict]) -> int:
     """
     Сохраняет обработанные рецепты в базу данных
@@ -61,8 +50,10 @@ async def save_recipes_to_db(recipes: List[Dict]) -> int:
                 skipped_count += 1
                 continue
             
-            # Создаём запись в БД
+            # Создаём запись в БД (теги - отдельная таблица)
+            tags = recipe_data.pop('tags', None)
             recipe = await RecipeBase.create(**recipe_data)
+            await recipe.set_tags(tags)
             
             print(f"[{i}/{len(recipes)}] ✅ Сохранен: {recipe.title}")
             print(f"            КБЖУ: {recipe.kbzhu_formatted}")
@@ -4,25 +4,17 @@
 
 import asyncio
 import sys
-from tortoise import Tortoise
-
-from bot.core.config import settings
-from bot.core.models import RecipeBase
+from bot.core.config import get_settings
+from bot.core.models import RecipeBase, close_db, init_db as init_models_db
 from bot.services.recipe_parser import parse_recipe_text, validate_recipe_data
 
 
 async def init_db():
     """Инициализация базы данных"""
-    await Tortoise.init(db_url=settings.database_url, modules={"models": ["models"]})
-    await Tortoise.generate_schemas()
+    await init_models_db(get_settings().database_url)
     print("✅ База данных инициализирована")
 
 
-async def close_db():
-    """Закрытие соединения с базой данных"""
-    await Tortoise.close_connections()
-
-
 async def import_recipe_from_text(recipe_text: str) -> bool:
     """
     Импортирует один рецепт из текста в базу данных
@@ -53,8 +45,10 @@ async def import_recipe_from_text(recipe_text: str) -> bool:
         print(f"⚠️  Рецепт '{recipe_data['title']}' уже существует")
         return False
 
-    # Создаём запись в БД
+    # Создаём запись в БД (теги - отдельная таблица)
+    tags = recipe_data.pop("tags", None)
     recipe = await RecipeBase.create(**recipe_data)
+    await recipe.set_tags(tags)
 
     print(f"✅ Добавлен рецепт: {recipe.title}")
     print(f"   КБЖУ: {recipe.kbzhu_formatted}")
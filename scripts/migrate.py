@@ -9,7 +9,8 @@ from pathlib import Path
 # Добавляем корень проекта в путь
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from bot.core.models import TORTOISE_ORM
+from bot.core.config import get_settings
+from bot.core.models import get_tortoise_config
 from tortoise import Tortoise
 
 
@@ -18,7 +19,7 @@ async def apply_migrations():
     print("🔄 Применение миграций...")
 
     # Подключаемся к базе данных и генерируем схемы
-    await Tortoise.init(config=TORTOISE_ORM)
+    await Tortoise.init(config=get_tortoise_config(get_settings().database_url))
     await Tortoise.generate_schemas()
 
     print("✅ Схемы базы данных созданы")
@@ -52,7 +53,7 @@ async def check_db_status():
     """Проверяет статус базы данных"""
     print("🔍 Проверка статуса базы данных...")
 
-    await Tortoise.init(config=TORTOISE_ORM)
+    await Tortoise.init(config=get_tortoise_config(get_settings().database_url))
 
     try:
         from tortoise.transactions import in_transaction
@@ -14,7 +14,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from bot.core.models import User, init_db, close_db
 from bot.web.dependencies import get_password_hash
-from bot.core.config import settings
+from bot.core.config import get_settings
 
 
 async def setup_railway_admin():
@@ -24,7 +24,7 @@ async def setup_railway_admin():
     print("=" * 50)
 
     # Подключение к БД
-    await init_db(settings.database_url)
+    await init_db(get_settings().database_url)
     print("✅ Подключение к базе данных установлено")
 
     try:
@@ -0,0 +1,37 @@
+"""
+Общие фикстуры тестов
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Тесты запускаются из корня репозитория: python -m pytest -q
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """
+    Запуск корутины на свежей SQLite базе
+
+    Плагина для async-тестов нет, поэтому тест передает функцию без аргументов,
+    возвращающую корутину: run_db(lambda: check()). Tortoise инициализируется
+    и закрывается внутри того же event loop, что и проверка.
+    """
+    from tortoise import Tortoise
+
+    from bot.core.models import init_db
+
+    db_url = f"sqlite://{tmp_path / 'test.sqlite3'}"
+
+    async def run(make_coro):
+        await init_db(db_url)
+        try:
+            return await make_coro()
+        finally:
+            await Tortoise.close_connections()
+
+    return lambda make_coro: asyncio.run(run(make_coro))
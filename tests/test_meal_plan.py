@@ -0,0 +1,129 @@
+"""
+Рацион: расчет КБЖУ по базе продуктов, Food и MealNutrition
+"""
+
+import asyncio
+import types
+
+import orjson
+import pytest
+
+from bot.services.openai_service import (
+    Food,
+    MealNutrition,
+    OpenAIService,
+    openai_service,
+)
+
+GPT_MEAL_PLAN = {
+    "meals": [
+        {
+            "meal_name": "Завтрак",
+            "foods": [
+                {"name": "яйца", "weight_g": 100},
+                {"name": "гречка", "weight_g": 200},
+            ],
+        },
+        {
+            "meal_name": "Ужин",
+            "foods": [
+                {"name": "огурцы", "weight_g": 100},
+                {"name": "zzzq", "weight_g": 50},
+            ],
+        },
+    ]
+}
+
+
+def test_compute_nutrition_returns_named_tuples():
+    plan = OpenAIService._compute_nutrition(GPT_MEAL_PLAN)
+    breakfast, dinner = plan["meals"]
+
+    assert breakfast["foods"] == [Food("яйца", 100), Food("гречка", 200)]
+    assert breakfast["foods"][1].weight_g == 200
+    assert breakfast["nutrition"] == MealNutrition(403, 21.1, 13.7, 50.7)
+    assert breakfast["nutrition"].protein_g == 21.1
+
+    # Продукт не из базы остается в рационе, но в КБЖУ не входит
+    assert dinner["foods"][1] == Food("zzzq (не найден в БД)", 50)
+    assert dinner["nutrition"] == MealNutrition(15, 0.8, 0.1, 2.8)
+
+    assert plan["calculated_daily_nutrition"] == MealNutrition(418, 21.9, 13.8, 53.5)
+
+
+def test_meal_without_known_foods_has_zero_nutrition():
+    snack = {"meal_name": "Перекус", "foods": [{"name": "zzzq", "weight_g": 10}]}
+    plan = OpenAIService._compute_nutrition({"meals": [snack]})
+    assert plan["meals"][0]["nutrition"] == MealNutrition(0, 0, 0, 0)
+    assert plan["calculated_daily_nutrition"] == MealNutrition(0, 0, 0, 0)
+
+
+def test_meal_plan_as_dict_is_json_ready():
+    plan = OpenAIService._compute_nutrition(GPT_MEAL_PLAN)
+    as_dict = orjson.loads(orjson.dumps(OpenAIService.meal_plan_as_dict(plan)))
+
+    assert as_dict["meals"][0]["foods"][0] == {"name": "яйца", "weight_g": 100}
+    assert as_dict["meals"][0]["nutrition"] == {
+        "calories": 403, "protein_g": 21.1, "fat_g": 13.7, "carbs_g": 50.7
+    }
+    assert as_dict["calculated_daily_nutrition"]["calories"] == 418
+
+
+def test_format_meal_plan_response():
+    text = OpenAIService.format_meal_plan_response(
+        OpenAIService._compute_nutrition(GPT_MEAL_PLAN)
+    )
+    assert "🍽 *Завтрак:*" in text
+    assert "  • яйца — 100 г" in text
+    assert "  _КБЖУ: 403 ккал, Б: 21.1г, Ж: 13.7г, У: 50.7г_" in text
+    assert text.endswith("🍞 Углеводы: 53.5 г")
+
+
+def test_generate_meal_plan(monkeypatch):
+    calls = []
+
+    async def fake_completion(**kwargs):
+        calls.append(kwargs)
+        content = orjson.dumps(GPT_MEAL_PLAN)
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(openai_service, "_create_completion", fake_completion)
+
+    plan = asyncio.run(openai_service.generate_meal_plan(
+        ingredients=["яйца", "гречка", " "],
+        meals_count=2,
+        target_daily_calories=1800,
+        target_daily_protein=100,
+        target_daily_fat=60,
+        target_daily_carbs=200,
+        daily_greens_weight=300,
+    ))
+    assert plan["calculated_daily_nutrition"] == MealNutrition(418, 21.9, 13.8, 53.5)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"ingredients": [" "]},
+    {"meals_count": 0},
+    {"target_daily_calories": 0},
+    # БЖУ дают намного больше калорий, чем цель
+    {"target_daily_protein": 500},
+])
+def test_generate_meal_plan_rejects_impossible_targets(monkeypatch, kwargs):
+    async def fail_completion(**_):
+        raise AssertionError("OpenAI не должен вызываться")
+
+    monkeypatch.setattr(openai_service, "_create_completion", fail_completion)
+    params = {
+        "ingredients": ["яйца"],
+        "meals_count": 3,
+        "target_daily_calories": 1800,
+        "target_daily_protein": 100,
+        "target_daily_fat": 60,
+        "target_daily_carbs": 200,
+        "daily_greens_weight": 300,
+        **kwargs,
+    }
+    with pytest.raises(ValueError):
+        asyncio.run(openai_service.generate_meal_plan(**params))
@@ -0,0 +1,184 @@
+"""
+RecipeBase: КБЖУ в десятых долях, теги и поиск по КБЖУ
+"""
+
+import importlib
+import math
+import sqlite3
+import types
+
+from bot.core.models import RecipeBase, Tag, _to_tenths
+from bot.services.recipe_search import find_recipes_by_kbzhu, find_recipes_by_tags
+
+# Миграции Aerich начинаются с цифры - обычный import не подходит
+kbzhu_tenths_migration = importlib.import_module(
+    "migrations.4_20241221000000_kbzhu_tenths"
+)
+
+
+async def _create_recipe(title: str, calories: float, protein: float = 10, **kwargs):
+    return await RecipeBase.create(
+        title=title,
+        calories_per_100g=calories,
+        protein_per_100g=protein,
+        fat_per_100g=kwargs.pop("fat", 5),
+        carbs_per_100g=kwargs.pop("carbs", 12),
+        ingredients="-",
+        instructions="-",
+        **kwargs,
+    )
+
+
+# --- Десятые доли ---
+
+def test_grams_round_half_up_to_tenths():
+    for grams, tenths in ((0.25, 3), (1.05, 11), (2.45, 25), (52.35, 524), (0.0, 0)):
+        recipe = RecipeBase(calories_per_100g=grams)
+        assert recipe.calories_per_100g_x10 == tenths, grams
+
+    recipe = RecipeBase(protein_per_100g=12.5)
+    assert recipe.protein_per_100g_x10 == 125
+    assert recipe.protein_per_100g == 12.5
+    recipe.protein_per_100g = 0.15
+    assert recipe.protein_per_100g_x10 == 2
+
+
+def test_migration_rounds_like_the_model():
+    """Миграция 4 переводит REAL в десятые доли так же, как _to_tenths"""
+    values = [i / 100 for i in range(0, 100000, 5)]
+    connection = sqlite3.connect(":memory:")
+    connection.execute('CREATE TABLE "t" ("v" REAL)')
+    connection.executemany('INSERT INTO "t" VALUES (?)', [(v,) for v in values])
+    db = types.SimpleNamespace(capabilities=types.SimpleNamespace(dialect="sqlite"))
+    tenths_sql = kbzhu_tenths_migration._to_tenths_sql(db, "v")
+    rows = connection.execute(f'SELECT "v", {tenths_sql} FROM "t"').fetchall()
+    assert [tenths for _, tenths in rows] == [_to_tenths(v) for v, _ in rows]
+
+
+def test_kbzhu_formatted_rounds_calories_half_to_even():
+    recipe = RecipeBase(
+        calories_per_100g_x10=525,
+        protein_per_100g_x10=125,
+        fat_per_100g_x10=30,
+        carbs_per_100g_x10=7,
+    )
+    assert recipe.kbzhu_formatted == "КБЖУ на 100 г:\n52 ккал 12.5г/3.0г/0.7г"
+    recipe.calories_per_100g_x10 = 535
+    assert recipe.kbzhu_formatted.splitlines()[1].startswith("54 ккал")
+
+
+def test_tenths_survive_a_round_trip(run_db):
+    async def check():
+        created = await _create_recipe(
+            "Суп", 52.35, protein=1.05, fat=0.25, carbs=3276.7
+        )
+        recipe = await RecipeBase.get(id=created.id)
+        assert (
+            recipe.calories_per_100g,
+            recipe.protein_per_100g,
+            recipe.fat_per_100g,
+            recipe.carbs_per_100g,
+        ) == (52.4, 1.1, 0.3, 3276.7)
+
+    run_db(check)
+
+
+# --- Теги ---
+
+def test_set_tags_normalizes_and_shares_tags(run_db):
+    async def check():
+        soup = await _create_recipe("Суп", 50)
+        porridge = await _create_recipe("Каша", 110)
+        await soup.set_tags("Суп, обед,  суп ,ОБЕД")
+        await porridge.set_tags("обед, завтрак")
+
+        await soup.fetch_related("tags")
+        assert sorted(soup.tags_text.split(", ")) == ["обед", "суп"]
+        # Одинаковые теги разных рецептов - одна строка в tags
+        assert await Tag.filter(name="обед").count() == 1
+        assert await Tag.all().count() == 3
+
+        await soup.set_tags("ужин")
+        await soup.fetch_related("tags")
+        assert soup.tags_text == "ужин"
+
+        await porridge.set_tags("")
+        await porridge.fetch_related("tags")
+        assert porridge.tags_text is None
+
+    run_db(check)
+
+
+def test_tags_text_needs_prefetch(run_db):
+    async def check():
+        recipe = await _create_recipe("Суп", 50)
+        await recipe.set_tags("обед")
+        assert (await RecipeBase.get(id=recipe.id)).tags_text is None
+
+    run_db(check)
+
+
+def test_find_recipes_by_tags(run_db):
+    async def check():
+        soup = await _create_recipe("Суп", 50)
+        salad = await _create_recipe("Салат", 30)
+        porridge = await _create_recipe("Каша", 110)
+        await soup.set_tags("суп, обед")
+        await salad.set_tags("обед, ужин")
+        await porridge.set_tags("завтрак")
+
+        found = await find_recipes_by_tags([" ОБЕД", "ужин", " "])
+        assert sorted(recipe.title for recipe in found) == ["Салат", "Суп"]
+        assert await find_recipes_by_tags([" ", ""]) == []
+
+    run_db(check)
+
+
+# --- Поиск по КБЖУ ---
+
+def test_kbzhu_search_ranks_by_distance_within_tolerance(run_db):
+    async def check():
+        for calories in (79, 119, 100, 93, 121, 104):
+            await _create_recipe(f"{calories} ккал", calories)
+
+        found = await find_recipes_by_kbzhu(target_calories=100)
+        assert [recipe.calories_per_100g for recipe in found] == [100, 104, 93, 119]
+        # Теги подгружены заранее
+        assert all(recipe.tags_text is None for recipe in found)
+
+        found = await find_recipes_by_kbzhu(target_calories=100, limit=2)
+        assert [recipe.calories_per_100g for recipe in found] == [100, 104]
+
+    run_db(check)
+
+
+def test_kbzhu_search_weighs_macros(run_db):
+    async def check():
+        await _create_recipe("Мало белка", 100, protein=2)
+        await _create_recipe("Много белка", 102, protein=20)
+
+        found = await find_recipes_by_kbzhu(target_calories=100)
+        assert found[0].title == "Мало белка"
+
+        found = await find_recipes_by_kbzhu(target_calories=100, target_protein=20)
+        assert found[0].title == "Много белка"
+
+    run_db(check)
+
+
+def test_kbzhu_search_rejects_impossible_targets(run_db):
+    async def check():
+        await _create_recipe("Суп", 100)
+        for targets in (
+            {"target_calories": 0},
+            {"target_calories": -100},
+            {"target_calories": math.inf},
+            {"target_calories": math.nan},
+            {"target_calories": 1e308},
+            {"target_calories": 100, "target_protein": math.inf},
+            # Больше, чем помещается в SMALLINT десятых долей
+            {"target_calories": 5000},
+        ):
+            assert await find_recipes_by_kbzhu(**targets) == [], targets
+
+    run_db(check)
@@ -0,0 +1,134 @@
+"""
+Список общей базы: keyset-курсор, кэш страниц и ETag
+"""
+
+import httpx
+from fastapi import FastAPI
+
+from bot.core.models import RecipeBase
+from bot.web.routes import api
+
+LIST_URL = "/api/v1/recipes-base"
+
+
+def _client() -> httpx.AsyncClient:
+    """Клиент к роутеру API без lifespan приложения (БД поднимает run_db)"""
+    app = FastAPI()
+    app.include_router(api.router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _create_recipes(count: int, prefix: str = "Рецепт") -> list:
+    return [
+        await RecipeBase.create(
+            title=f"{prefix} {i}",
+            calories_per_100g=100 + i,
+            protein_per_100g=10,
+            fat_per_100g=5,
+            carbs_per_100g=12,
+            ingredients="-",
+            instructions="-",
+        )
+        for i in range(count)
+    ]
+
+
+def test_cursor_pages_through_to_the_end(run_db):
+    async def check():
+        api._base_recipes_cache.clear()
+        created = await _create_recipes(7)
+        seen = []
+        pages = 0
+        async with _client() as client:
+            params = {"limit": 3}
+            while True:
+                response = await client.get(LIST_URL, params=params)
+                assert response.status_code == 200
+                seen.extend(int(recipe["id"]) for recipe in response.json())
+                pages += 1
+                assert pages <= 3, "Курсор не продвигается"
+                next_cursor = response.headers.get("X-Next-Cursor")
+                if not next_cursor:
+                    break
+                params = {"limit": 3, "cursor": next_cursor}
+
+        # Новые сверху, без повторов и пропусков
+        assert seen == [recipe.id for recipe in reversed(created)]
+
+    run_db(check)
+
+
+def test_bad_cursor_is_400(run_db):
+    async def check():
+        api._base_recipes_cache.clear()
+        async with _client() as client:
+            for cursor in ("не-курсор", "zz", "MjAyNC0wMS0wMQ=="):
+                response = await client.get(LIST_URL, params={"cursor": cursor})
+                assert response.status_code == 400, cursor
+
+    run_db(check)
+
+
+def test_limit_is_bounded(run_db):
+    async def check():
+        api._base_recipes_cache.clear()
+        async with _client() as client:
+            for params in ({"limit": 0}, {"limit": api.BASE_RECIPES_PAGE_MAX + 1},
+                           {"offset": -1}):
+                response = await client.get(LIST_URL, params=params)
+                assert response.status_code == 422, params
+        assert not api._base_recipes_cache
+
+    run_db(check)
+
+
+def test_page_is_cached_until_ttl(run_db):
+    async def check():
+        api._base_recipes_cache.clear()
+        await _create_recipes(2)
+        async with _client() as client:
+            first = await client.get(LIST_URL, params={"limit": 2})
+            extra = (await _create_recipes(1, prefix="Новый"))[0]
+
+            # Новый рецепт не виден, пока страница в кэше
+            cached = await client.get(LIST_URL, params={"limit": 2})
+            assert cached.content == first.content
+
+            api._base_recipes_cache.clear()
+            fresh = await client.get(LIST_URL, params={"limit": 2})
+            assert fresh.json()[0]["id"] == str(extra.id)
+            assert fresh.headers["ETag"] != first.headers["ETag"]
+
+    run_db(check)
+
+
+def test_if_none_match_gives_304(run_db):
+    async def check():
+        api._base_recipes_cache.clear()
+        await _create_recipes(2)
+        async with _client() as client:
+            response = await client.get(LIST_URL, params={"limit": 2})
+            etag = response.headers["ETag"]
+            assert etag.startswith('W/"')
+
+            not_modified = await client.get(
+                LIST_URL, params={"limit": 2}, headers={"If-None-Match": etag}
+            )
+            assert not_modified.status_code == 304
+            assert not_modified.content == b""
+            assert not_modified.headers["ETag"] == etag
+
+            # ETag в списке тоже подходит, чужой - нет
+            listed = await client.get(
+                LIST_URL,
+                params={"limit": 2},
+                headers={"If-None-Match": f'W/"x", {etag}'},
+            )
+            assert listed.status_code == 304
+            other = await client.get(
+                LIST_URL, params={"limit": 2}, headers={"If-None-Match": 'W/"x"'}
+            )
+            assert other.status_code == 200
+            assert other.content == response.content
+
+    run_db(check)